@@ -5,14 +5,14 @@ This module monitors blockchain transactions for fills and stores them in the da
 """
 
 import logging
+import sqlite3
 from typing import Any, Dict, List, Optional, cast
 
 import requests
-from web3 import Web3
 
-from src.config import CHAINS, FILL_RELAY_METHOD_ID, RELAYER_ADDRESS
+from src.config import CHAINS, CHAINS_BY_ID, FILL_RELAY_METHOD_ID, RELAYER_ADDRESS
 from src.db_utils import get_db_connection
-from src.web3_utils import get_spokepool_contracts
+from src.web3_utils import bytes32_to_checksum_address, get_spokepool_contracts
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -45,7 +45,7 @@ def get_last_processed_block(chain_id: int) -> int:
             return cast(int, result["last_block"])
 
         # If no fills exist, get start_block from chain config
-        chain = next((c for c in CHAINS if c["chain_id"] == chain_id), None)
+        chain = CHAINS_BY_ID.get(chain_id)
         if chain and "start_block" in chain:
             return cast(int, chain["start_block"])
         return 0
@@ -116,14 +116,21 @@ def get_fill_transactions(chain: Dict, start_block: int) -> List[Dict]:
         return []
 
 
-def process_and_store_fill(tx: Dict, chain: Dict, contracts: Dict[int, Any]):
+def process_and_store_fill(
+    tx: Dict, chain: Dict, contracts: Dict[int, Any], conn: sqlite3.Connection
+):
     """
     Process a fill transaction and store it in the database.
 
+    The insert is not committed here; the caller commits all fills of a chain
+    in one transaction. A failed insert is undone by SQLite on its own and
+    doesn't affect the other fills of the transaction.
+
     Args:
         tx: Transaction data from the blockchain explorer
         chain: Chain configuration dictionary
         contracts: Dictionary mapping chain IDs to contract instances
+        conn: Database connection the fill is written with
     """
     try:
         # Get contract instance for decoding
@@ -142,10 +149,6 @@ def process_and_store_fill(tx: Dict, chain: Dict, contracts: Dict[int, Any]):
             return
 
         # Get route_id
-        conn = get_db_connection()
-        if not conn:
-            return
-
         try:
             cursor = conn.cursor()
             cursor.execute(
@@ -160,8 +163,8 @@ def process_and_store_fill(tx: Dict, chain: Dict, contracts: Dict[int, Any]):
                 (
                     int(relay_data["originChainId"]),
                     chain["chain_id"],
-                    Web3.to_checksum_address(relay_data["inputToken"].hex()[-40:]),
-                    Web3.to_checksum_address(relay_data["outputToken"].hex()[-40:]),
+                    bytes32_to_checksum_address(relay_data["inputToken"]),
+                    bytes32_to_checksum_address(relay_data["outputToken"]),
                 ),
             )
             result = cursor.fetchone()
@@ -204,13 +207,11 @@ def process_and_store_fill(tx: Dict, chain: Dict, contracts: Dict[int, Any]):
                     tx["hash"],
                     tx.get("isError") == "0",  # is_success based on transaction status
                     route_id,
-                    Web3.to_checksum_address(relay_data["depositor"].hex()[-40:]),
-                    Web3.to_checksum_address(relay_data["recipient"].hex()[-40:]),
-                    Web3.to_checksum_address(
-                        relay_data["exclusiveRelayer"].hex()[-40:]
-                    ),
-                    Web3.to_checksum_address(relay_data["inputToken"].hex()[-40:]),
-                    Web3.to_checksum_address(relay_data["outputToken"].hex()[-40:]),
+                    bytes32_to_checksum_address(relay_data["depositor"]),
+                    bytes32_to_checksum_address(relay_data["recipient"]),
+                    bytes32_to_checksum_address(relay_data["exclusiveRelayer"]),
+                    bytes32_to_checksum_address(relay_data["inputToken"]),
+                    bytes32_to_checksum_address(relay_data["outputToken"]),
                     str(relay_data["inputAmount"]),
                     str(relay_data["outputAmount"]),
                     int(relay_data["originChainId"]),
@@ -220,9 +221,7 @@ def process_and_store_fill(tx: Dict, chain: Dict, contracts: Dict[int, Any]):
                     relay_data.get("exclusivityDeadline"),
                     relay_data.get("message", ""),
                     decoded_input[1].get("repaymentChainId"),
-                    Web3.to_checksum_address(
-                        decoded_input[1]["repaymentAddress"].hex()[-40:]
-                    )
+                    bytes32_to_checksum_address(decoded_input[1]["repaymentAddress"])
                     if decoded_input[1].get("repaymentAddress")
                     else None,
                     str(int(tx["gasUsed"]) * int(tx["gasPrice"])),
@@ -231,15 +230,11 @@ def process_and_store_fill(tx: Dict, chain: Dict, contracts: Dict[int, Any]):
                     int(tx["timeStamp"]),
                 ),
             )
-            conn.commit()
             status = "successful" if tx.get("isError") == "0" else "failed"
             logger.debug(f"Stored {status} fill {tx['hash']} for {chain['name']}")
 
         except Exception as e:
             logger.error(f"Error storing fill {tx['hash']}: {str(e)}")
-            conn.rollback()
-        finally:
-            conn.close()
 
     except Exception as e:
         logger.error(f"Error processing fill {tx.get('hash', 'unknown')}: {str(e)}")
@@ -261,9 +256,20 @@ def collect_fills():
         try:
             last_block = get_last_processed_block(chain["chain_id"])
             fills = get_fill_transactions(chain, last_block)
-
-            for fill in fills:
-                process_and_store_fill(fill, chain, contracts)
+            if not fills:
+                continue
+
+            # One connection and one commit per chain instead of per fill
+            conn = get_db_connection()
+            try:
+                for fill in fills:
+                    process_and_store_fill(fill, chain, contracts, conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
 
         except Exception as e:
             logger.error(f"Error processing chain {chain['name']}: {str(e)}")
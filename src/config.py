@@ -65,6 +65,7 @@ CHAINS = [
         "start_block": 22418181, # post 5/5/25 capital pull
         # "start_block": 23565787, # post 10/14/25
         "bundle_block_index": 0,  # Index in bundleEvaluationBlockNumbers array
+        "block_time": 12,  # Average seconds per block
     },
     {
         "chain_id": 10,
@@ -78,6 +79,7 @@ CHAINS = [
         "start_block": 135387300, # post 5/5/25 capital pull
         # "start_block": 142292751, # post 10/14/25
         "bundle_block_index": 1,  # Index in bundleEvaluationBlockNumbers array
+        "block_time": 2,  # Average seconds per block
     },
     {
         "chain_id": 42161,
@@ -91,6 +93,7 @@ CHAINS = [
         "start_block": 333537560, # post 5/5/25 capital pull 
         # "start_block": 388856137, # post 10/14/25
         "bundle_block_index": 4,  # Index in bundleEvaluationBlockNumbers array
+        "block_time": 0.25,  # Average seconds per block
     },
     # {
     #     "chain_id": 8453,
@@ -102,9 +105,13 @@ CHAINS = [
     #     # "start_block": 27011711,  # Post breaking Relayer changes
     #     "start_block": 29833823, # post 5/5/25 capital pull
     #     "bundle_block_index": 6,  # Index in bundleEvaluationBlockNumbers array
+    #     "block_time": 2,  # Average seconds per block
     # },
 ]
 
+# Chain configurations keyed by chain ID
+CHAINS_BY_ID = {chain["chain_id"]: chain for chain in CHAINS}
+
 
 # Logging configuration
 def setup_logging():
@@ -138,7 +145,7 @@ def get_chains(chain_id):
     Returns:
         dict: Chain configuration or None if not found
     """
-    return next((chain for chain in CHAINS if chain["chain_id"] == chain_id), None)
+    return CHAINS_BY_ID.get(chain_id)
 
 
 def chain_id_to_name(chain_id):
@@ -151,8 +158,8 @@ def chain_id_to_name(chain_id):
     Returns:
         str: Chain key (short name) or None if not found
     """
-    chain_keys = {chain["chain_id"]: chain["name"] for chain in CHAINS}
-    return chain_keys.get(chain_id)
+    chain = CHAINS_BY_ID.get(chain_id)
+    return chain["name"] if chain else None
 
 
 def get_db_path():
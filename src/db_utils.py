@@ -16,20 +16,59 @@ from src.config import get_db_path
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# journal_mode=WAL is stored in the database file, so it is only set on the
+# first connection of the process; the other PRAGMAs apply per connection
+_wal_enabled = False
+
 
 def get_db_connection():
     """
     Create and return a connection to the SQLite database.
 
+    The connection uses the WAL journal with synchronous=NORMAL, so readers
+    don't block the writer and commits don't wait on an fsync each, plus
+    in-memory temp storage and a 64 MiB page cache.
+
     Returns:
         sqlite3.Connection: Database connection object
     """
+    global _wal_enabled
     db_path = get_db_path()
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    if not _wal_enabled:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_enabled = True
+    conn.executescript(
+        """
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-65536;
+        PRAGMA mmap_size=268435456;
+        """
+    )
     return conn
 
 
+def optimize_and_close(conn):
+    """
+    Run PRAGMA optimize on a connection and close it.
+
+    SQLite only re-analyzes the tables the connection has queried, and only
+    when their statistics are stale, so this is meant for the connections
+    doing the bulk of a module's work, right before they are closed.
+
+    Args:
+        conn (sqlite3.Connection): Connection to optimize and close
+    """
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        logger.warning(f"PRAGMA optimize failed: {e}")
+    finally:
+        conn.close()
+
+
 def execute_query(query, params=(), fetchall=False, commit=False):
     """
     Execute a SQL query with error handling.
@@ -154,10 +193,10 @@ def insert_token(token_address, chain_id, symbol, decimals):
         decimals (int): Token decimals
 
     Returns:
-        int or None: Token ID if newly inserted, None if already existed, 0 on error
+        int or None: 1 if newly inserted, None if already existed, 0 on error
     """
     exists_query = """
-    SELECT ROWID FROM Token 
+    SELECT 1 FROM Token 
     WHERE token_address = ? AND chain_id = ?
     """
 
@@ -175,11 +214,11 @@ def insert_token(token_address, chain_id, symbol, decimals):
                 (token_address, int(chain_id), symbol, decimals),
                 commit=True,
             )
-            token_id = cursor.lastrowid
             logger.info(
                 f"Inserted token {symbol} ({token_address}) on chain {chain_id}"
             )
-            return token_id
+            # Token is a WITHOUT ROWID table, so there is no rowid to return
+            return cursor.rowcount
         else:
             # Return None to indicate token already existed
             return None
@@ -4,19 +4,17 @@ by analyzing the relayer's blockchain transactions.
 """
 
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, cast
 
 import requests
-from web3 import Web3
 
-from src.config import (
-    CHAINS,
-    FILL_RELAY_METHOD_ID,
-    RELAYER_ADDRESS,
-    chain_id_to_name,
-)
+from src.config import CHAINS, FILL_RELAY_METHOD_ID, RELAYER_ADDRESS
 from src.db_utils import get_db_connection, insert_route, insert_token
-from src.web3_utils import get_erc20_token_info, get_spokepool_contracts
+from src.web3_utils import (
+    bytes32_to_checksum_address,
+    get_erc20_token_info,
+    get_spokepool_contracts,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -44,6 +42,9 @@ def get_fill_routes() -> List[Dict[str, Any]]:
     routes = []
     unique_routes = set()  # Track unique routes
 
+    # Chain names by ID, built once instead of per route
+    name_by_id = {cast(int, c["chain_id"]): c["name"] for c in CHAINS}
+
     for destination_chain in CHAINS:
         # Ensure chain_id is properly handled as integer
         if "chain_id" not in destination_chain or destination_chain["chain_id"] is None:
@@ -52,12 +53,12 @@ def get_fill_routes() -> List[Dict[str, Any]]:
             )
             continue
 
-        # Convert chain_id to string first, then to int for safety
-        chain_id_str = str(destination_chain["chain_id"])
         try:
-            destination_chain_id = int(chain_id_str)
-        except ValueError:
-            logger.error(f"Invalid chain_id in chain configuration: {chain_id_str}")
+            destination_chain_id = int(cast(int, destination_chain["chain_id"]))
+        except (TypeError, ValueError):
+            logger.error(
+                f"Invalid chain_id in chain configuration: {destination_chain['chain_id']}"
+            )
             continue
 
         if destination_chain_id not in contracts:
@@ -103,11 +104,11 @@ def get_fill_routes() -> List[Dict[str, Any]]:
                         relay_data = decoded_input[1]["relayData"]
 
                         # Extract token addresses and chain IDs
-                        input_token = Web3.to_checksum_address(
-                            relay_data["inputToken"].hex()[-40:]
+                        input_token = bytes32_to_checksum_address(
+                            relay_data["inputToken"]
                         )
-                        output_token = Web3.to_checksum_address(
-                            relay_data["outputToken"].hex()[-40:]
+                        output_token = bytes32_to_checksum_address(
+                            relay_data["outputToken"]
                         )
                         origin_chain_id = int(relay_data["originChainId"])
 
@@ -128,11 +129,11 @@ def get_fill_routes() -> List[Dict[str, Any]]:
                             routes.append(
                                 {
                                     "origin_chain_id": origin_chain_id,
-                                    "origin_chain_name": chain_id_to_name(
+                                    "origin_chain_name": name_by_id.get(
                                         origin_chain_id
                                     ),
                                     "destination_chain_id": destination_chain_id,
-                                    "destination_chain_name": chain_id_to_name(
+                                    "destination_chain_name": name_by_id.get(
                                         destination_chain_id
                                     ),
                                     "input_token": input_token,
@@ -148,10 +149,9 @@ def get_fill_routes() -> List[Dict[str, Any]]:
                                         "symbol"
                                     ),
                                     "output_token_name": output_token_info.get("name"),
-                                    "output_token_decimals": input_token_info.get(
+                                    "output_token_decimals": output_token_info.get(
                                         "decimals"
-                                    )
-                                    or output_token_info.get("decimals"),
+                                    ),
                                 }
                             )
 
@@ -234,8 +234,10 @@ def insert_token_info_into_db(routes: List[Dict[str, Any]]) -> None:
 
         # Insert unique tokens into database
         for token in unique_tokens.values():
+            # decimals comes back from the contract call; store it as a plain int
+            decimals = int(token["decimals"]) if token["decimals"] is not None else None
             result = insert_token(
-                token["address"], token["chain_id"], token["symbol"], token["decimals"]
+                token["address"], token["chain_id"], token["symbol"], decimals
             )
             if result:
                 new_tokens += 1
@@ -11,17 +11,185 @@ This module:
 
 import asyncio
 import logging
+import math
+import random
 import sqlite3
-from typing import Dict, List, Optional, Tuple, cast
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple, cast
 
 import aiohttp
+from web3.contract import Contract
+from web3.types import BlockData
 
-from src.config import CHAINS, get_db_path
-from src.web3_utils import get_spokepool_contracts
+from src.config import CHAINS, CHAINS_BY_ID, get_db_path
+from src.db_utils import optimize_and_close
+from src.web3_utils import get_spoke_event_topic, get_spokepool_contracts
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Across suggested-fees endpoint used to price LP fees
+_LP_FEE_URL = "https://app.across.to/api/suggested-fees"
+
+# Enrichment UPDATE, kept as one constant so the shared connection's
+# statement cache reuses the compiled statement on every batch
+_UPDATE_FILL_SQL = """
+    UPDATE Fill 
+    SET deposit_timestamp = ?, 
+        deposit_block_number = ?,
+        lp_fee = ?,
+        enrichment_attempts = 0,
+        last_enrichment_attempt = NULL
+    WHERE tx_hash = ?
+"""
+
+# topic0 of the spoke pool FundsDeposited event
+FUNDS_DEPOSITED_TOPIC = get_spoke_event_topic("FundsDeposited")
+
+# Stay under SQLite's 999 bound parameter limit
+QUERY_BATCH_SIZE = 500
+
+# Provider errors meaning an eth_getLogs block range has to be made smaller.
+# The generic -32000 code is left out: providers also use it for missing
+# headers, rate limits and internal errors, so it only counts as a size
+# error when the message carries one of these markers as well
+RANGE_LIMIT_ERRORS = (
+    "filter not found",
+    "-32005",
+    "block range",
+    "query returned more than",
+    "limit exceeded",
+)
+
+# A rejected eth_getLogs range is not split below this many blocks, nor more
+# than MAX_RANGE_SPLIT_DEPTH times; past either limit the error is retried
+# with backoff like any other
+MIN_RANGE_SPLIT_SPAN = 10_000
+MAX_RANGE_SPLIT_DEPTH = 12
+
+# Retries of a range that failed for a reason other than its size
+MAX_RANGE_RETRIES = 3
+
+# Number of deposit ID batches queried at the same time on one chain
+MAX_PARALLEL_BATCHES = 4
+
+# Deposits are searched for up to this long before the earliest fill
+DEPOSIT_LOOKBACK_SECONDS = 2 * 24 * 60 * 60
+
+# HTTP statuses from the fee API that are retried with backoff
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# Cap in-flight LP fee requests to avoid tripping the API rate limit
+MAX_CONCURRENT_REQUESTS = 20
+
+# Upper bound in seconds on a single retry delay
+MAX_RETRY_DELAY = 60.0
+
+# Number of completed fills written per UPDATE transaction
+UPDATE_FLUSH_SIZE = 200
+
+# A fill whose deposit event wasn't found is retried after this many seconds,
+# and only once every CAPPED_ENRICHMENT_RETRY_INTERVAL seconds after
+# MAX_ENRICHMENT_ATTEMPTS runs without a match
+ENRICHMENT_RETRY_INTERVAL = 60 * 60
+CAPPED_ENRICHMENT_RETRY_INTERVAL = 24 * 60 * 60
+MAX_ENRICHMENT_ATTEMPTS = 5
+
+# Records one more enrichment run that found no deposit event for a fill
+_RECORD_MISSING_DEPOSIT_SQL = """
+    UPDATE Fill
+    SET enrichment_attempts = enrichment_attempts + 1,
+        last_enrichment_attempt = ?
+    WHERE tx_hash = ?
+"""
+
+
+# Shared connection for the short enrichment queries, see _get_conn()
+_conn: Optional[sqlite3.Connection] = None
+_conn_lock = threading.Lock()
+
+
+def _connect(**kwargs) -> sqlite3.Connection:
+    """
+    Open a connection to the database tuned for the enrichment workload.
+
+    WAL lets the read queries run while updates are written, and
+    synchronous=NORMAL avoids an fsync on every commit.
+
+    Args:
+        **kwargs: Extra arguments passed to sqlite3.connect()
+
+    Returns:
+        sqlite3.Connection: Database connection object
+    """
+    conn = sqlite3.connect(get_db_path(), **kwargs)
+    conn.executescript(
+        """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-65536;
+        PRAGMA mmap_size=268435456;
+        """
+    )
+    return conn
+
+
+def _get_conn() -> sqlite3.Connection:
+    """
+    Get the shared enrichment connection, opening it on first use.
+
+    The connection is in autocommit mode (transactions are started with an
+    explicit BEGIN) and may be used from worker threads; callers must hold
+    _conn_lock while using it.
+
+    Returns:
+        sqlite3.Connection: Shared database connection
+    """
+    global _conn
+    if _conn is None:
+        _conn = _connect(isolation_level=None, check_same_thread=False)
+    return _conn
+
+
+def close_connection() -> None:
+    """
+    Close the shared enrichment connection if it is open, refreshing the
+    planner statistics of the tables it used first.
+    """
+    global _conn
+    with _conn_lock:
+        if _conn is not None:
+            optimize_and_close(_conn)
+            _conn = None
+
+
+@lru_cache(maxsize=1)
+def _latest_deposit_blocks() -> Dict[int, int]:
+    """
+    Get the latest known deposit block for every origin chain in one query.
+
+    Cached for the duration of an enrichment run; enrich_fills() clears it
+    so each run sees the blocks stored by the previous one.
+
+    Returns:
+        Dictionary mapping origin chain IDs to their latest deposit block number
+    """
+    with _conn_lock:
+        cursor = _get_conn().execute(
+            """
+            SELECT origin_chain_id, MAX(deposit_block_number) 
+            FROM Fill 
+            WHERE deposit_block_number IS NOT NULL
+            GROUP BY origin_chain_id
+            """
+        )
+        return {int(chain_id): block for chain_id, block in cursor.fetchall()}
+
 
 def get_deposit_start_block(chain_id: int) -> int:
     """
@@ -37,27 +205,16 @@ def get_deposit_start_block(chain_id: int) -> int:
     Raises:
         TypeError: If chain_id or start_block in configuration has invalid type
     """
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-
     try:
         # Try to get the latest deposit block for this chain
-        cursor.execute(
-            """
-            SELECT MAX(deposit_block_number) 
-            FROM Fill 
-            WHERE origin_chain_id = ?
-            """,
-            (chain_id,),
-        )
-        result = cursor.fetchone()
+        latest_block = _latest_deposit_blocks().get(chain_id)
 
-        if result and result[0] is not None:
-            logger.info(f"Using latest deposit block {result[0]} for chain {chain_id}")
-            return result[0] - 1000000  # buffer in case any misses in prev run.
+        if latest_block is not None:
+            logger.info(f"Using latest deposit block {latest_block} for chain {chain_id}")
+            return latest_block - 1000000  # buffer in case any misses in prev run.
 
         # If no deposits found, use chain's start_block - 1M blocks
-        chain = next((c for c in CHAINS if c["chain_id"] == chain_id), None)
+        chain = CHAINS_BY_ID.get(chain_id)
         if not chain:
             raise ValueError(f"No configuration found for chain {chain_id}")
 
@@ -78,227 +235,569 @@ def get_deposit_start_block(chain_id: int) -> int:
             f"Error getting deposit start block for chain {chain_id}: {str(e)}"
         )
         raise
-    finally:
-        conn.close()
 
 
-def get_unenriched_fills() -> List[Dict]:
+def iter_unenriched_fills(batch_size: int = 2000) -> Iterator[List[Dict]]:
+    """
+    Stream Fill records that need deposit timestamp and LP fee enrichment.
+
+    Fills are read in pages of batch_size in tx_hash order, each page starting
+    after the last tx_hash of the previous one (keyset pagination over
+    idx_fill_pending_enrichment). Every page is a short read on the shared
+    connection, so no read transaction is held open while enrichment results
+    are written, and fills still pending after their page are not read again.
+    The generator may be advanced from an executor thread, one page at a time.
+
+    Fills whose deposit event was not found in a previous run are skipped
+    until ENRICHMENT_RETRY_INTERVAL has passed, or CAPPED_ENRICHMENT_RETRY_INTERVAL
+    once they reach MAX_ENRICHMENT_ATTEMPTS, so fills missed during an RPC
+    outage are still picked up again.
+
+    Args:
+        batch_size: Number of fills per yielded chunk
+
+    Yields:
+        Lists of Fill records missing deposit timestamp or LP fee information,
+        with deposit_id as an int. deposit_block_number is set when a previous run already located the
+        deposit event but could not finish enrichment.
+    """
+    now = int(time.time())
+    retry_before = now - ENRICHMENT_RETRY_INTERVAL
+    capped_retry_before = now - CAPPED_ENRICHMENT_RETRY_INTERVAL
+    last_tx_hash = ""
+
+    while True:
+        with _conn_lock:
+            cursor = _get_conn().execute(
+                """
+                SELECT 
+                    tx_hash,
+                    deposit_id,
+                    origin_chain_id,
+                    destination_chain_id,
+                    input_token,
+                    output_token,
+                    input_amount,
+                    tx_timestamp,
+                    deposit_block_number
+                FROM Fill 
+                WHERE is_success = 1 
+                  AND (deposit_timestamp IS NULL OR lp_fee IS NULL)
+                  AND (
+                      last_enrichment_attempt IS NULL
+                      OR last_enrichment_attempt < CASE
+                          WHEN enrichment_attempts < ? THEN ? ELSE ?
+                      END
+                  )
+                  AND tx_hash > ?
+                ORDER BY tx_hash
+                LIMIT ?
+                """,
+                (
+                    MAX_ENRICHMENT_ATTEMPTS,
+                    retry_before,
+                    capped_retry_before,
+                    last_tx_hash,
+                    batch_size,
+                ),
+            )
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+
+        if not rows:
+            break
+
+        fills = [dict(zip(columns, row)) for row in rows]
+        # deposit_id is stored as TEXT but can exceed 64 bits, so it is
+        # converted here once instead of with CAST in SQL
+        for fill in fills:
+            fill["deposit_id"] = int(fill["deposit_id"])
+        last_tx_hash = fills[-1]["tx_hash"]
+        yield fills
+
+        if len(rows) < batch_size:
+            break
+
+
+def get_known_deposits(fills: List[Dict]) -> Dict[Tuple[int, int], Dict]:
     """
-    Retrieve all Fill records that need deposit timestamp and LP fee enrichment.
+    Look up deposits that other Fill rows already have enrichment data for.
+
+    A deposit can have several Fill rows (e.g. a failed and a successful
+    fill), so a deposit that is pending for one row may already be resolved
+    on another. Those are returned in the same shape as FundsDeposited events
+    so no RPC query is needed for them.
+
+    Args:
+        fills: Fill records from iter_unenriched_fills()
 
     Returns:
-        List of Fill records missing deposit timestamp or LP fee information
-    """
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT 
-            tx_hash,
-            deposit_id,
-            origin_chain_id,
-            destination_chain_id,
-            input_token,
-            output_token,
-            input_amount
-        FROM Fill 
-        WHERE is_success = 1 
-          AND (deposit_timestamp IS NULL OR lp_fee IS NULL)
-    """)
-
-    columns = [col[0] for col in cursor.description]
-    fills = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    conn.close()
-    return fills
-
-
-def get_deposit_events(deposit_ids: List[str]) -> Dict[str, Dict]:
-    """
-    Find FundsDeposited events matching the given deposit IDs across all chains.
-    
-    Uses deposit ID batching and block chunking with automatic fallback:
-    - Deposit IDs are batched into configurable groups to avoid "exceed max topics" errors
-    - Block ranges are chunked with hybrid approach:
-      1. First tries create_filter() with large chunks (fast)
-      2. If "filter not found" error, retries with get_logs() + 5000-block chunks (reliable)
+        Dictionary mapping (origin_chain_id, deposit_id) to an event-like dict
+        with args.depositId, args.quoteTimestamp and blockNumber
+    """
+    ids_by_chain: Dict[int, set] = defaultdict(set)
+    for fill in fills:
+        ids_by_chain[int(fill["origin_chain_id"])].add(str(fill["deposit_id"]))
+
+    known_deposits: Dict[Tuple[int, int], Dict] = {}
+    with _conn_lock:
+        conn = _get_conn()
+        for chain_id, chain_deposit_ids in ids_by_chain.items():
+            deposit_ids = list(chain_deposit_ids)
+            for i in range(0, len(deposit_ids), QUERY_BATCH_SIZE):
+                batch = deposit_ids[i : i + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"""
+                    SELECT deposit_id, deposit_timestamp, deposit_block_number
+                    FROM Fill
+                    WHERE origin_chain_id = ?
+                      AND deposit_id IN ({placeholders})
+                      AND deposit_timestamp IS NOT NULL
+                      AND deposit_block_number IS NOT NULL
+                    """,
+                    (chain_id, *batch),
+                )
+                for deposit_id, deposit_timestamp, deposit_block_number in cursor:
+                    known_deposits[(chain_id, int(deposit_id))] = {
+                        "args": {
+                            "depositId": int(deposit_id),
+                            "quoteTimestamp": deposit_timestamp,
+                        },
+                        "blockNumber": deposit_block_number,
+                    }
+
+    return known_deposits
+
+
+def get_deposit_logs(
+    contract, from_block: int, to_block: int, deposit_ids: List[int]
+) -> List[Dict]:
+    """
+    Fetch FundsDeposited logs for the given deposit IDs and decode them.
+
+    Only depositId, quoteTimestamp and the block number are used by the
+    enrichment, so they are read straight from the raw log instead of running
+    every log through the full ABI decoder:
+    - depositId is the second indexed argument (topics[2])
+    - quoteTimestamp is the fifth static word of the data
+      (after inputToken, outputToken, inputAmount, outputAmount)
 
     Args:
-        deposit_ids: List of deposit IDs to search for
+        contract: Spoke pool contract on the origin chain
+        from_block: First block to search (inclusive)
+        to_block: Last block to search (inclusive)
+        deposit_ids: Deposit IDs to filter on
 
     Returns:
-        Dictionary mapping deposit IDs to their corresponding events
+        List of event-like dicts with args.depositId, args.quoteTimestamp
+        and blockNumber
+    """
+    logs = contract.w3.eth.get_logs(
+        {
+            "address": contract.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [
+                FUNDS_DEPOSITED_TOPIC,
+                None,  # destinationChainId
+                [
+                    "0x" + deposit_id.to_bytes(32, "big").hex()
+                    for deposit_id in deposit_ids
+                ],
+            ],
+        }
+    )
+
+    return [
+        {
+            "args": {
+                "depositId": int.from_bytes(log["topics"][2], "big"),
+                "quoteTimestamp": int.from_bytes(log["data"][128:160], "big"),
+            },
+            "blockNumber": log["blockNumber"],
+        }
+        for log in logs
+    ]
 
-    Raises:
-        TypeError: If chain_id in configuration has invalid type
+
+def query_deposit_events(
+    contract, chain_name: str, from_block: int, to_block: int, deposit_ids: List[int]
+) -> Tuple[List[Dict], bool]:
     """
-    # Get contracts for all chains
-    contracts = get_spokepool_contracts()
-    if not contracts:
-        logger.error("No contracts initialized")
-        return {}
+    Query FundsDeposited events for the given deposit IDs within a block range.
+
+    The deposit IDs are passed as one OR-topic filter, so the whole range is
+    normally covered by a single eth_getLogs call. When the provider rejects a
+    range as too large (e.g. "filter not found", -32005, result limits), the
+    range is split in half and each half is retried the same way, down to
+    MIN_RANGE_SPLIT_SPAN blocks and MAX_RANGE_SPLIT_DEPTH splits. Other errors
+    (timeouts, rate limits), and size errors past those limits, are retried on
+    the same range with exponential backoff, up to MAX_RANGE_RETRIES times in
+    total for a range and the halves split from it.
+
+    Args:
+        contract: Spoke pool contract on the origin chain
+        chain_name: Chain name for logging
+        from_block: First block to search (inclusive)
+        to_block: Last block to search (inclusive)
+        deposit_ids: Deposit IDs to filter on
+
+    Returns:
+        Tuple of (matching FundsDeposited events, whether every block of the
+        range was searched; False if a range was given up on)
+    """
+    events = []
+    complete = True
+
+    # Block ranges still to query with their retry count and split depth,
+    # processed in ascending block order
+    pending_ranges = [(from_block, to_block, 0, 0)]
+
+    while pending_ranges:
+        range_start, range_end, attempt, depth = pending_ranges.pop()
+
+        logger.info(f"Querying {chain_name} blocks {range_start} to {range_end}")
+
+        try:
+            range_events = get_deposit_logs(
+                contract, range_start, range_end, deposit_ids
+            )
+            events.extend(range_events)
+
+            if range_events:
+                logger.info(f"Found {len(range_events)} events in this range")
+
+        except Exception as e:
+            error_msg = str(e)
+
+            # Range too large for the provider - split it and retry both halves
+            if (
+                range_end - range_start + 1 >= 2 * MIN_RANGE_SPLIT_SPAN
+                and depth < MAX_RANGE_SPLIT_DEPTH
+                and any(marker in error_msg for marker in RANGE_LIMIT_ERRORS)
+            ):
+                middle = (range_start + range_end) // 2
+                logger.warning(
+                    f"Range {range_start}-{range_end} rejected by {chain_name} "
+                    f"provider, splitting at block {middle}"
+                )
+                pending_ranges.append((middle + 1, range_end, attempt, depth + 1))
+                pending_ranges.append((range_start, middle, attempt, depth + 1))
+            elif attempt < MAX_RANGE_RETRIES:
+                delay = min(2**attempt * random.uniform(0.5, 1.5), MAX_RETRY_DELAY)
+                logger.warning(
+                    f"Error getting events from {chain_name} "
+                    f"blocks {range_start}-{range_end}: {error_msg}. "
+                    f"Retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{MAX_RANGE_RETRIES})"
+                )
+                time.sleep(delay)
+                pending_ranges.append((range_start, range_end, attempt + 1, depth))
+            else:
+                logger.error(
+                    f"Error getting events from {chain_name} "
+                    f"blocks {range_start}-{range_end}: {error_msg}"
+                )
+                complete = False
+
+    return events, complete
+
 
-    # Convert string IDs to integers for contract filtering
-    int_deposit_ids = [int(deposit_id) for deposit_id in deposit_ids]
+def get_chain_deposit_events(
+    contract: Contract,
+    chain_id: int,
+    chain_name: str,
+    deposit_ids: List[int],
+    hinted_blocks: Dict[int, List[int]],
+    latest_block: Optional[BlockData],
+    earliest_fill_timestamp: Optional[int] = None,
+) -> Tuple[List[Dict], Set[int]]:
+    """
+    Find FundsDeposited events for pending deposits on a single origin chain.
+
+    - Deposits whose block is already known (deposit_block_number from a
+      previous run) get a targeted single-block get_logs() query
+    - All other deposit IDs are batched into configurable groups to avoid
+      "exceed max topics" errors and the batches are range-scanned in parallel
+      from the chain's start block.
+      A deposit always precedes its fill, so when the earliest fill time is
+      known the scan starts at the origin block estimated for that time
+      (minus a lookback window) if that is later than the start block.
 
-    all_events = []
+    Args:
+        contract: Spoke pool contract on the origin chain
+        chain_id: Origin chain ID
+        chain_name: Chain name for logging
+        deposit_ids: Deposit IDs without a known deposit block
+        hinted_blocks: Deposit IDs grouped by their known deposit block
+        latest_block: Latest block of the chain (number and timestamp), or
+            None if it couldn't be fetched
+        earliest_fill_timestamp: Earliest tx_timestamp of the fills for
+            deposit_ids, used to narrow the scanned block range
 
+    Returns:
+        Tuple of (FundsDeposited events found on this chain, the deposit IDs
+        whose search covered every block it was meant to). Deposit IDs in a
+        failed block query, a dropped range or a skipped scan are left out
+    """
     # Batch deposit IDs to avoid exceeding topic limits
     # RPC providers have varying limits on topic filters (typically 100-1000)
     # Adjust this value based on your provider's limits
-    DEPOSIT_ID_BATCH_SIZE = 1000
-    
-    # Split deposit IDs into batches
-    deposit_id_batches = [
-        int_deposit_ids[i:i + DEPOSIT_ID_BATCH_SIZE]
-        for i in range(0, len(int_deposit_ids), DEPOSIT_ID_BATCH_SIZE)
-    ]
-    
-    logger.info(f"Split {len(int_deposit_ids)} deposit IDs into {len(deposit_id_batches)} batches")
+    DEPOSIT_ID_BATCH_SIZE = 500
 
-    # Query each chain for deposit events
-    for chain in CHAINS:
+    chain_events = []
+    searched_ids: Set[int] = set()
+
+    # Deposits found in a previous run: query only their block
+    for block_number, block_deposit_ids in hinted_blocks.items():
         try:
-            try:
-                chain_id = cast(int, chain.get("chain_id"))
-            except (TypeError, ValueError) as e:
-                logger.error(
-                    f"Invalid chain_id in configuration: {chain.get('chain_id')}"
+            chain_events.extend(
+                get_deposit_logs(
+                    contract, block_number, block_number, block_deposit_ids
+                )
+            )
+            searched_ids.update(block_deposit_ids)
+        except Exception as e:
+            logger.error(
+                f"Error getting events from {chain_name} "
+                f"block {block_number}: {str(e)}"
+            )
+
+    if deposit_ids:
+        # Get appropriate start block for this chain
+        start_block = get_deposit_start_block(chain_id)
+
+        if latest_block is None:
+            logger.error(f"No current block for {chain_name}, skipping range scan")
+            return chain_events, searched_ids
+        current_block = latest_block["number"]
+
+        # Estimate the origin block of the earliest possible deposit
+        chain = CHAINS_BY_ID.get(chain_id, {})
+        block_time = cast(Optional[float], chain.get("block_time"))
+        if earliest_fill_timestamp is not None and block_time:
+            earliest_deposit_time = earliest_fill_timestamp - DEPOSIT_LOOKBACK_SECONDS
+            elapsed = max(latest_block["timestamp"] - earliest_deposit_time, 0)
+            estimated_block = current_block - int(elapsed / block_time)
+            if estimated_block > start_block:
+                logger.info(
+                    f"Narrowing {chain_name} deposit search start from block "
+                    f"{start_block} to {estimated_block} based on fill times"
                 )
-                raise TypeError(f"Invalid chain_id type in configuration: {str(e)}")
+                start_block = estimated_block
+
+        # Split deposit IDs into batches
+        deposit_id_batches = [
+            deposit_ids[i : i + DEPOSIT_ID_BATCH_SIZE]
+            for i in range(0, len(deposit_ids), DEPOSIT_ID_BATCH_SIZE)
+        ]
+
+        logger.info(
+            f"Searching for {len(deposit_ids)} deposit events on {chain_name} "
+            f"from block {start_block} to {current_block} "
+            f"in {len(deposit_id_batches)} batches"
+        )
 
-            chain_name = chain["name"]
+        def query_batch(
+            batch_idx: int, deposit_id_batch: List[int]
+        ) -> Tuple[List[Dict], bool]:
+            logger.info(
+                f"Processing deposit ID batch {batch_idx}/{len(deposit_id_batches)} "
+                f"({len(deposit_id_batch)} IDs) on {chain_name}"
+            )
+            return query_deposit_events(
+                contract,
+                chain_name,
+                start_block,
+                current_block,
+                deposit_id_batch,
+            )
 
-            # Get appropriate start block for this chain
-            start_block = get_deposit_start_block(chain_id)
+        # Process the batches of deposit IDs concurrently
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_BATCHES) as executor:
+            for deposit_id_batch, (batch_events, complete) in zip(
+                deposit_id_batches,
+                executor.map(
+                    query_batch,
+                    range(1, len(deposit_id_batches) + 1),
+                    deposit_id_batches,
+                ),
+            ):
+                chain_events.extend(batch_events)
+                if complete:
+                    searched_ids.update(deposit_id_batch)
+
+    logger.info(f"Found {len(chain_events)} total events on {chain_name}")
+    return chain_events, searched_ids
+
+
+async def get_latest_blocks_async() -> Dict[int, BlockData]:
+    """
+    Fetch the latest block of every chain concurrently.
 
-            if chain_id not in contracts:
-                logger.warning(f"No contract configured for chain {chain_name}")
-                continue
+    Returns:
+        Dictionary mapping chain IDs to their latest block. Chains whose
+        block couldn't be fetched are left out.
+    """
+    contracts = get_spokepool_contracts()
+    loop = asyncio.get_running_loop()
+
+    chain_ids = list(contracts)
+    results = await asyncio.gather(
+        *[
+            loop.run_in_executor(None, contracts[chain_id].w3.eth.get_block, "latest")
+            for chain_id in chain_ids
+        ],
+        return_exceptions=True,
+    )
+
+    latest_blocks: Dict[int, BlockData] = {}
+    for chain_id, result in zip(chain_ids, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error getting current block for chain {chain_id}: {result}")
+            continue
+        latest_blocks[chain_id] = result
+
+    return latest_blocks
+
+
+async def get_deposit_events_async(
+    fills: List[Dict],
+    latest_blocks: Optional[Dict[int, BlockData]] = None,
+) -> Tuple[Dict[Tuple[int, int], Dict], Set[Tuple[int, int]]]:
+    """
+    Find FundsDeposited events for the given fills on their origin chains.
 
-            contract = contracts[chain_id]
+    Each fill's deposit can only live on its origin chain, so deposit IDs are
+    grouped by origin_chain_id and only that chain is queried. Deposits that
+    another Fill row already resolved are taken from the database. Every
+    chain has its own RPC endpoint, so the chains are queried concurrently in
+    worker threads and the total time is bounded by the slowest chain.
 
-            # Get current block number for this chain
-            try:
-                current_block = contract.w3.eth.block_number
-            except Exception as e:
-                logger.error(f"Error getting current block for {chain_name}: {str(e)}")
-                continue
+    Args:
+        fills: Fill records from iter_unenriched_fills()
+        latest_blocks: Latest block per chain from get_latest_blocks_async();
+            fetched here if not given
 
-            logger.info(
-                f"Searching for deposit events on {chain_name} from block {start_block} to {current_block}"
+    Returns:
+        Tuple of:
+        - Dictionary mapping (origin_chain_id, deposit_id) to the corresponding
+          event. Deposit IDs are only unique per origin chain.
+        - The (origin_chain_id, deposit_id) pairs that were searched
+          completely. A deposit missing from the events is only known to be
+          missing if it is in this set; the search of the others failed.
+
+    Raises:
+        TypeError: If chain_id in configuration has invalid type
+    """
+    # Get contracts for all chains
+    contracts = get_spokepool_contracts()
+    if not contracts:
+        logger.error("No contracts initialized")
+        return {}, set()
+
+    # Load the latest deposit block of every chain with a single query
+    _latest_deposit_blocks()
+
+    loop = asyncio.get_running_loop()
+
+    # Deposits already resolved on other Fill rows need no RPC query
+    events_by_deposit_id = await loop.run_in_executor(None, get_known_deposits, fills)
+    if events_by_deposit_id:
+        logger.info(
+            f"Found {len(events_by_deposit_id)} deposits already known from other fills"
+        )
+
+    # Group deposit IDs by origin chain, and by block when the block is known
+    ids_by_chain: Dict[int, List[int]] = defaultdict(list)
+    earliest_fill_by_chain: Dict[int, int] = {}
+    ids_by_chain_block: Dict[int, Dict[int, List[int]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    for fill in fills:
+        origin_chain_id = int(fill["origin_chain_id"])
+        deposit_id = fill["deposit_id"]
+        if (origin_chain_id, deposit_id) in events_by_deposit_id:
+            continue
+        if fill.get("deposit_block_number") is not None:
+            ids_by_chain_block[origin_chain_id][fill["deposit_block_number"]].append(
+                deposit_id
             )
+        else:
+            ids_by_chain[origin_chain_id].append(deposit_id)
+            fill_timestamp = fill.get("tx_timestamp")
+            if fill_timestamp is not None:
+                earliest_fill_by_chain[origin_chain_id] = min(
+                    earliest_fill_by_chain.get(origin_chain_id, fill_timestamp),
+                    fill_timestamp,
+                )
 
-            # Block chunking with very large size (effectively no chunking for most cases)
-            BLOCK_CHUNK_SIZE = 10000000  # 10 million blocks: otherwise ` ERROR - Error getting events from Arbitrum batch 1 blocks 332537560-342537559: {'code': -32000, 'message': 'filter not found'}
-            chain_events = []
-            
-            try:
-                # Process each batch of deposit IDs
-                for batch_idx, deposit_id_batch in enumerate(deposit_id_batches, 1):
-                    logger.info(
-                        f"Processing deposit ID batch {batch_idx}/{len(deposit_id_batches)} "
-                        f"({len(deposit_id_batch)} IDs) on {chain_name}"
-                    )
-                    
-                    current_from_block = start_block
-                    
-                    # Query through block ranges in chunks
-                    while current_from_block <= current_block:
-                        current_to_block = min(current_from_block + BLOCK_CHUNK_SIZE - 1, current_block)
-                        
-                        logger.info(
-                            f"Querying {chain_name} batch {batch_idx} blocks {current_from_block} to {current_to_block}"
-                        )
-                        
-                        try:
-                            # Try create_filter first (faster for large ranges)
-                            event_filter = contract.events.FundsDeposited.create_filter(
-                                from_block=current_from_block,
-                                to_block=current_to_block,
-                                argument_filters={"depositId": deposit_id_batch},
-                            )
-                            chunk_events = event_filter.get_all_entries()
-                            chain_events.extend(chunk_events)
-                            
-                            if chunk_events:
-                                logger.info(f"Found {len(chunk_events)} events in this chunk")
-                            
-                        except Exception as e:
-                            error_msg = str(e)
-                            
-                            # Check if it's a "filter not found" error - if so, retry with get_logs
-                            if "filter not found" in error_msg or "-32000" in error_msg:
-                                logger.warning(
-                                    f"Filter expired for {chain_name} batch {batch_idx} "
-                                    f"blocks {current_from_block}-{current_to_block}. "
-                                    f"Retrying with get_logs() and smaller chunks..."
-                                )
-                                
-                                # Retry with get_logs using smaller 5000-block chunks
-                                FALLBACK_CHUNK_SIZE = 10000
-                                fallback_events = []
-                                fallback_start = current_from_block
-                                
-                                while fallback_start <= current_to_block:
-                                    fallback_end = min(fallback_start + FALLBACK_CHUNK_SIZE - 1, current_to_block)
-                                    
-                                    try:
-                                        logger.info(
-                                            f"Fallback query {chain_name} batch {batch_idx} "
-                                            f"blocks {fallback_start} to {fallback_end}"
-                                        )
-                                        
-                                        small_chunk_events = contract.events.FundsDeposited.get_logs(
-                                            from_block=fallback_start,
-                                            to_block=fallback_end,
-                                            argument_filters={"depositId": deposit_id_batch}
-                                        )
-                                        fallback_events.extend(small_chunk_events)
-                                        
-                                    except Exception as fallback_error:
-                                        logger.error(
-                                            f"Fallback query failed for {chain_name} batch {batch_idx} "
-                                            f"blocks {fallback_start}-{fallback_end}: {str(fallback_error)}"
-                                        )
-                                    
-                                    fallback_start = fallback_end + 1
-                                
-                                chain_events.extend(fallback_events)
-                                if fallback_events:
-                                    logger.info(
-                                        f"Found {len(fallback_events)} events via fallback method "
-                                        f"for blocks {current_from_block}-{current_to_block}"
-                                    )
-                            else:
-                                # Different error - just log it
-                                logger.error(
-                                    f"Error getting events from {chain_name} batch {batch_idx} "
-                                    f"blocks {current_from_block}-{current_to_block}: {error_msg}"
-                                )
-                        
-                        # Move to next block chunk
-                        current_from_block = current_to_block + 1
-                
-                all_events.extend(chain_events)
-                logger.info(f"Found {len(chain_events)} total events on {chain_name}")
-
-            except Exception as e:
-                logger.error(f"Error getting events from {chain_name}: {str(e)}")
-                continue
+    # Several pending fills can share a deposit; put each ID in a filter once
+    for chain_id, chain_deposit_ids in ids_by_chain.items():
+        ids_by_chain[chain_id] = list(dict.fromkeys(chain_deposit_ids))
+    for block_ids in ids_by_chain_block.values():
+        for block_number, block_deposit_ids in block_ids.items():
+            block_ids[block_number] = list(dict.fromkeys(block_deposit_ids))
 
-        except Exception as e:
-            logger.error(
-                f"Error processing chain {chain.get('name', 'unknown')}: {str(e)}"
+    if latest_blocks is None and ids_by_chain:
+        latest_blocks = await get_latest_blocks_async()
+
+    chain_ids = []
+    chain_names = []
+    tasks = []
+
+    # Query each chain for deposit events
+    for chain in CHAINS:
+        try:
+            chain_id = cast(int, chain.get("chain_id"))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Invalid chain_id in configuration: {chain.get('chain_id')}")
+            raise TypeError(f"Invalid chain_id type in configuration: {str(e)}")
+
+        chain_name = cast(str, chain["name"])
+        int_deposit_ids = ids_by_chain.get(chain_id, [])
+        hinted_blocks = ids_by_chain_block.get(chain_id, {})
+
+        if not int_deposit_ids and not hinted_blocks:
+            logger.info(f"No pending deposits originating on {chain_name}")
+            continue
+
+        if chain_id not in contracts:
+            logger.warning(f"No contract configured for chain {chain_name}")
+            continue
+
+        chain_ids.append(chain_id)
+        chain_names.append(chain_name)
+        tasks.append(
+            loop.run_in_executor(
+                None,
+                get_chain_deposit_events,
+                contracts[chain_id],
+                chain_id,
+                chain_name,
+                int_deposit_ids,
+                dict(hinted_blocks),
+                (latest_blocks or {}).get(chain_id),
+                earliest_fill_by_chain.get(chain_id),
             )
+        )
 
-    # Convert to dictionary format mapping deposit IDs to events
-    events_by_deposit_id = {}
-    for event in all_events:
-        deposit_id = str(event["args"]["depositId"])
-        events_by_deposit_id[deposit_id] = event
+    # Map (origin chain, deposit ID) to events
+    searched_deposits: Set[Tuple[int, int]] = set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for chain_id, chain_name, result in zip(chain_ids, chain_names, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error getting events from {chain_name}: {str(result)}")
+            continue
+        chain_events, searched_ids = result
+        for event in chain_events:
+            events_by_deposit_id[(chain_id, event["args"]["depositId"])] = event
+        searched_deposits.update(
+            (chain_id, deposit_id) for deposit_id in searched_ids
+        )
 
-    return events_by_deposit_id
+    return events_by_deposit_id, searched_deposits
 
 
 async def get_lp_fee(
@@ -309,12 +808,16 @@ async def get_lp_fee(
     amount: str,
     deposit_timestamp: int,
     session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
     max_retries: int = 3,
     initial_delay: float = 1.0,
 ) -> Optional[str]:
     """
     Retrieve LP fee from the Across API for a given transfer.
-    Implements exponential backoff retry logic for failed requests.
+    Implements exponential backoff retry logic with jitter for timeouts,
+    throttling and server errors, honouring the Retry-After header on 429 and
+    503 responses (capped at MAX_RETRY_DELAY). Other 4xx responses fail
+    immediately.
 
     Args:
         input_token: Token address on origin chain
@@ -324,13 +827,21 @@ async def get_lp_fee(
         amount: Amount being transferred (in smallest unit)
         deposit_timestamp: Unix timestamp when deposit was made
         session: Aiohttp client session for making requests
+        semaphore: Semaphore bounding the number of in-flight API requests
         max_retries: Maximum number of retry attempts (default: 3)
         initial_delay: Initial delay in seconds before first retry (default: 1.0)
 
     Returns:
         LP fee as a string in the smallest unit, or None if all retries fail
     """
-    url = f"https://app.across.to/api/suggested-fees?inputToken={input_token}&outputToken={output_token}&originChainId={origin_chain_id}&destinationChainId={destination_chain_id}&amount={amount}&timestamp={deposit_timestamp}"
+    params = {
+        "inputToken": input_token,
+        "outputToken": output_token,
+        "originChainId": str(origin_chain_id),
+        "destinationChainId": str(destination_chain_id),
+        "amount": amount,
+        "timestamp": str(deposit_timestamp),
+    }
 
     # Old code without exponential backoff
     # try:
@@ -347,29 +858,48 @@ async def get_lp_fee(
 
     for attempt in range(max_retries + 1):  # +1 for initial attempt
         try:
-            async with session.get(url) as response:
+            async with semaphore, session.get(_LP_FEE_URL, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
                     return str(data["lpFee"]["total"])
+                retry_after = response.headers.get("Retry-After")
 
-                # If not last attempt, prepare for retry
-                if attempt < max_retries:
-                    delay = initial_delay * (2**attempt)  # Exponential backoff
-                    logger.warning(
-                        f"API request failed with status {response.status}. "
-                        f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
-                    )
-                    await asyncio.sleep(delay)
-                else:
-                    logger.error(
-                        f"API request failed with status {response.status} "
-                        f"after {max_retries} retries"
-                    )
-                    return None
+            # Only timeouts, throttling and server errors are worth retrying;
+            # other 4xx (unsupported token, bad amount) fail the same way again
+            if response.status not in RETRYABLE_STATUSES:
+                logger.error(
+                    f"API request failed with non-retryable status {response.status}"
+                )
+                return None
+
+            # If not last attempt, prepare for retry
+            if attempt < max_retries:
+                # Exponential backoff with jitter
+                delay = initial_delay * (2**attempt) * random.uniform(0.5, 1.5)
+                if response.status in (429, 503) and retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                delay = min(delay, MAX_RETRY_DELAY)
+                logger.warning(
+                    f"API request failed with status {response.status}. "
+                    f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
+                )
+                await asyncio.sleep(delay)
+            else:
+                logger.error(
+                    f"API request failed with status {response.status} "
+                    f"after {max_retries} retries"
+                )
+                return None
 
         except Exception as e:
             if attempt < max_retries:
-                delay = initial_delay * (2**attempt)
+                delay = min(
+                    initial_delay * (2**attempt) * random.uniform(0.5, 1.5),
+                    MAX_RETRY_DELAY,
+                )
                 logger.warning(
                     f"Error retrieving LP fee: {str(e)}. "
                     f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -384,123 +914,220 @@ async def get_lp_fee(
     return None  # Should never reach here, but keeps mypy happy
 
 
-def update_fill_with_enrichment(
-    tx_hash: str, deposit_timestamp: int, deposit_block_number: int, lp_fee: str
-) -> bool:
+def update_fills_with_enrichment(
+    updates: List[Tuple[int, int, Optional[str], str]],
+) -> int:
     """
-    Update a Fill record with deposit timestamp, block number and LP fee.
+    Update Fill records with deposit timestamp, block number and LP fee.
+
+    All updates are applied with a single executemany() inside one
+    transaction, so a batch costs one commit instead of one per fill. The
+    deposit of these fills was found, so their count of runs without a
+    deposit event is reset.
 
     Args:
-        tx_hash: Transaction hash of the fill
-        deposit_timestamp: Unix timestamp of the deposit event
-        deposit_block_number: Block number where deposit occurred
-        lp_fee: Calculated LP fee
+        updates: (deposit_timestamp, deposit_block_number, lp_fee, tx_hash)
+            tuples. lp_fee may be None if it couldn't be retrieved; the
+            deposit block is still stored so the next run can query it directly.
 
     Returns:
-        Boolean indicating success
+        Number of Fill rows updated
     """
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
+    if not updates:
+        return 0
 
-    try:
-        cursor.execute(
-            """
-            UPDATE Fill 
-            SET deposit_timestamp = ?, 
-                deposit_block_number = ?,
-                lp_fee = ? 
-            WHERE tx_hash = ?
-            """,
-            (deposit_timestamp, deposit_block_number, lp_fee, tx_hash),
-        )
-        conn.commit()
-        return cursor.rowcount > 0
-    except Exception as e:
-        logger.error(f"Error updating fill {tx_hash}: {str(e)}")
-        conn.rollback()
-        return False
-    finally:
-        conn.close()
+    with _conn_lock:
+        conn = _get_conn()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN")
+            cursor.executemany(_UPDATE_FILL_SQL, updates)
+            updated = cursor.rowcount
+            cursor.execute("COMMIT")
+            return updated
+        except Exception as e:
+            logger.error(f"Error updating {len(updates)} fills: {str(e)}")
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            return 0
+
+
+def record_missing_deposits(tx_hashes: List[str]) -> int:
+    """
+    Record an enrichment run that found no deposit event for the given fills.
+
+    Args:
+        tx_hashes: Transaction hashes of the fills without a deposit event
+
+    Returns:
+        Number of Fill rows updated
+    """
+    if not tx_hashes:
+        return 0
+
+    now = int(time.time())
+    with _conn_lock:
+        conn = _get_conn()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN")
+            cursor.executemany(
+                _RECORD_MISSING_DEPOSIT_SQL,
+                [(now, tx_hash) for tx_hash in tx_hashes],
+            )
+            updated = cursor.rowcount
+            cursor.execute("COMMIT")
+            return updated
+        except Exception as e:
+            logger.error(
+                f"Error recording missing deposits for {len(tx_hashes)} fills: {str(e)}"
+            )
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            return 0
 
 
 async def process_fill_batch(
-    fills: List[Dict], deposit_events: Dict[str, Dict]
+    fills: List[Dict],
+    deposit_events: Dict[Tuple[int, int], Dict],
+    searched_deposits: Set[Tuple[int, int]],
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
 ) -> Tuple[int, int]:
     """
     Process a batch of fills asynchronously.
 
+    Fills on the same route with similar amounts and deposit times share one
+    LP fee quote for the bucket's median amount, scaled to each fill's amount.
+
     Args:
         fills: List of fills to process
-        deposit_events: Dictionary of deposit events
+        deposit_events: Deposit events keyed by (origin_chain_id, deposit_id)
+        searched_deposits: (origin_chain_id, deposit_id) pairs whose search
+            completed; only fills in it count a run without a deposit event
+        session: Aiohttp client session shared by all batches of the run
+        semaphore: Semaphore bounding the number of in-flight API requests
 
     Returns:
         Tuple of (processed_count, failed_count)
     """
     processed = 0
     failed = 0
-    missing_deposits: List[str] = []
-    api_failures: List[str] = []
+    missing_deposits: List[int] = []
+    missing_deposit_fills: List[str] = []
+    api_failures: List[int] = []
+    updates: List[Tuple[int, int, Optional[str], str]] = []
+
+    # Group fills whose LP fee can be derived from one quote: same route,
+    # deposit time within a minute, and amount within the same log-scale
+    # bucket (~26% wide, where the fee rate is effectively flat)
+    buckets: Dict[Tuple, List[Tuple[Dict, int, int]]] = defaultdict(list)
+    for fill in fills:
+        deposit_id = fill["deposit_id"]
+        event = deposit_events.get((fill["origin_chain_id"], deposit_id))
+        if event is None:
+            failed += 1
+            missing_deposits.append(deposit_id)
+            # A failed search says nothing about the deposit, so the fill is
+            # left as it is and comes back on the next run
+            if (fill["origin_chain_id"], deposit_id) in searched_deposits:
+                missing_deposit_fills.append(fill["tx_hash"])
+            continue
+
+        deposit_timestamp = event["args"]["quoteTimestamp"]
+        deposit_block_number = event["blockNumber"]
+        amount = int(fill["input_amount"])
+
+        bucket = (
+            fill["input_token"],
+            fill["output_token"],
+            fill["origin_chain_id"],
+            fill["destination_chain_id"],
+            deposit_timestamp // 60,
+            # Amount 1 already maps to bucket 0, so zero amounts get their own
+            round(math.log10(amount) * 10) if amount > 0 else -1,
+        )
+        buckets[bucket].append((fill, deposit_timestamp, deposit_block_number))
 
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for fill in fills:
-            deposit_id = fill["deposit_id"]
-            if deposit_id not in deposit_events:
-                failed += 1
-                missing_deposits.append(deposit_id)
-                continue
-
-            event = deposit_events[deposit_id]
-            deposit_timestamp = event["args"]["quoteTimestamp"]
-            deposit_block_number = event["blockNumber"]
-
-            # Create task for getting LP fee
-            task = asyncio.create_task(
-                get_lp_fee(
-                    fill["input_token"],
-                    fill["output_token"],
-                    fill["origin_chain_id"],
-                    fill["destination_chain_id"],
-                    fill["input_amount"],
-                    deposit_timestamp,
-                    session,
-                )
+    loop = asyncio.get_running_loop()
+
+    async def quote_bucket(
+        bucket_fills: List[Tuple[Dict, int, int]],
+    ) -> Tuple[List[Tuple[Dict, int, int]], int, Optional[str]]:
+        # Quote the median amount and scale the fee to each fill's amount
+        bucket_fills.sort(key=lambda item: int(item[0]["input_amount"]))
+        quote_fill, quote_timestamp, _ = bucket_fills[len(bucket_fills) // 2]
+        try:
+            lp_fee = await get_lp_fee(
+                quote_fill["input_token"],
+                quote_fill["output_token"],
+                quote_fill["origin_chain_id"],
+                quote_fill["destination_chain_id"],
+                quote_fill["input_amount"],
+                quote_timestamp,
+                session,
+                semaphore,
             )
-            tasks.append(
+        except Exception as e:
+            logger.error(f"Error processing fill {quote_fill['tx_hash']}: {str(e)}")
+            lp_fee = None
+        return bucket_fills, int(quote_fill["input_amount"]), lp_fee
+
+    tasks = [
+        asyncio.create_task(quote_bucket(bucket_fills))
+        for bucket_fills in buckets.values()
+    ]
+
+    # Handle LP fees as they arrive and write them in chunks, so slow
+    # requests don't hold back the results that are already in
+    for next_result in asyncio.as_completed(tasks):
+        bucket_fills, quote_amount, lp_fee = await next_result
+        for fill, deposit_timestamp, deposit_block_number in bucket_fills:
+            fill_lp_fee = lp_fee
+            amount = int(fill["input_amount"])
+            if fill_lp_fee is not None and amount != quote_amount and quote_amount:
+                fill_lp_fee = str(int(fill_lp_fee) * amount // quote_amount)
+            # Without an LP fee, still remember where the deposit is so
+            # the retry skips the scan
+            updates.append(
                 (
-                    fill["tx_hash"],
                     deposit_timestamp,
                     deposit_block_number,
-                    task,
-                    deposit_id,
+                    fill_lp_fee,
+                    fill["tx_hash"],
                 )
             )
-
-        # Wait for all LP fee requests to complete
-        for tx_hash, deposit_timestamp, deposit_block_number, task, deposit_id in tasks:
-            try:
-                lp_fee = await task
-                if lp_fee is not None:
-                    update_fill_with_enrichment(
-                        tx_hash, deposit_timestamp, deposit_block_number, lp_fee
-                    )
-                    processed += 1
-                else:
-                    failed += 1
-                    api_failures.append(deposit_id)
-            except Exception as e:
-                logger.error(f"Error processing fill {tx_hash}: {str(e)}")
+            if fill_lp_fee is not None:
+                processed += 1
+            else:
                 failed += 1
-                api_failures.append(deposit_id)
+                api_failures.append(fill["deposit_id"])
+
+        if len(updates) >= UPDATE_FLUSH_SIZE:
+            await loop.run_in_executor(None, update_fills_with_enrichment, updates)
+            updates = []
+
+    # Write the remaining enrichment results, off the event loop
+    await loop.run_in_executor(None, update_fills_with_enrichment, updates)
 
-    # Log failure statistics
+    # Remember fills without a deposit event so the next runs back off on them
+    await loop.run_in_executor(None, record_missing_deposits, missing_deposit_fills)
+
+    # Log failure statistics; the ID lists can run to thousands of entries,
+    # so they are only written at debug level
     if missing_deposits:
         logger.info(f"Missing deposit events: {len(missing_deposits)} fills")
-        logger.info(f"  Deposit IDs: {', '.join(str(id) for id in missing_deposits)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"  Deposit IDs: {', '.join(str(id) for id in missing_deposits)}"
+            )
 
     if api_failures:
         logger.info(f"LP fee API failures: {len(api_failures)} fills")
-        logger.info(f"  Deposit IDs: {', '.join(str(id) for id in api_failures)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"  Deposit IDs: {', '.join(str(id) for id in api_failures)}")
 
     return processed, failed
 
@@ -508,26 +1135,92 @@ async def process_fill_batch(
 async def enrich_fills_async():
     """
     Main async function to enrich Fill records with deposit timestamps and LP fees.
+
+    Pending fills are processed one chunk at a time to keep memory bounded.
+    The deposit events of each chunk are looked up while the LP fees of the
+    previous chunk are fetched, so RPC and fee API latency overlap.
     """
-    # Get fills that need enrichment
-    fills = get_unenriched_fills()
-    if not fills:
-        logger.info("No fills pending enrichment")
-        return
+    loop = asyncio.get_running_loop()
+    total_fills = 0
+    total_processed = 0
+    total_failed = 0
+    latest_blocks: Optional[Dict[int, BlockData]] = None
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENT_REQUESTS,
+        limit_per_host=MAX_CONCURRENT_REQUESTS,
+        keepalive_timeout=60,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+    )
+    # Bound each request so a stalled connection goes to the retry path
+    timeout = aiohttp.ClientTimeout(total=30, connect=5)
+
+    async def finish_chunk(
+        chunk_idx: int, fills: List[Dict], events_task: asyncio.Task
+    ) -> None:
+        nonlocal total_processed, total_failed
+        deposit_events, searched_deposits = await events_task
+        logger.info(
+            f"Chunk {chunk_idx}: found {len(deposit_events)} matching deposit events"
+        )
+
+        processed, failed = await process_fill_batch(
+            fills, deposit_events, searched_deposits, session, semaphore
+        )
+        total_processed += processed
+        total_failed += failed
+        logger.info(
+            f"Chunk {chunk_idx}: {processed} processed, {failed} failed "
+            f"({total_processed + total_failed}/{total_fills} fills handled so far)"
+        )
+
+    # One session for the whole run, so pooled keep-alive connections to the
+    # fee API carry over from one chunk to the next
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # The previous chunk, whose LP fees are fetched while the deposit
+        # events of the next chunk are being looked up
+        pending: Optional[Tuple[int, List[Dict], asyncio.Task]] = None
+
+        # Get fills that need enrichment. Each page is read in the default
+        # executor like the other database calls, so the query and the wait
+        # for _conn_lock don't block the event loop
+        pages = iter_unenriched_fills()
+        chunk_idx = 0
+        while True:
+            fills = await loop.run_in_executor(None, next, pages, None)
+            if fills is None:
+                break
+            chunk_idx += 1
+            total_fills += len(fills)
+            logger.info(
+                f"Chunk {chunk_idx}: found {len(fills)} fills needing enrichment"
+            )
 
-    logger.info(f"Found {len(fills)} fills needing enrichment")
+            # Chain heads are fetched once per run and shared by all chunks
+            if latest_blocks is None:
+                latest_blocks = await get_latest_blocks_async()
 
-    # Get all the deposit IDs we need to look up
-    deposit_ids = [fill["deposit_id"] for fill in fills]
+            # Start finding deposit events for those fills on their origin
+            # chains, then process the previous chunk while that runs
+            events_task = asyncio.create_task(
+                get_deposit_events_async(fills, latest_blocks)
+            )
+            if pending is not None:
+                await finish_chunk(*pending)
+            pending = (chunk_idx, fills, events_task)
 
-    # Find deposit events for those IDs
-    deposit_events = get_deposit_events(deposit_ids)
-    logger.info(f"Found {len(deposit_events)} matching deposit events")
+        if pending is not None:
+            await finish_chunk(*pending)
 
-    # Process fills in batches
-    processed, failed = await process_fill_batch(fills, deposit_events)
+    if not total_fills:
+        logger.info("No fills pending enrichment")
+        return
 
-    logger.info(f"Enrichment complete: {processed} processed, {failed} failed")
+    logger.info(
+        f"Enrichment complete: {total_processed} processed, {total_failed} failed"
+    )
 
 
 def enrich_fills():
@@ -537,7 +1230,11 @@ def enrich_fills():
     logger.info("=" * 80)
     logger.info("Enriching fills with deposit timestamps and LP fees")
 
-    asyncio.run(enrich_fills_async())
+    try:
+        _latest_deposit_blocks.cache_clear()
+        asyncio.run(enrich_fills_async())
+    finally:
+        close_connection()
 
 
 if __name__ == "__main__":
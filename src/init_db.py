@@ -3,7 +3,8 @@
 Initialize the database for the relayer refactor project.
 
 This script follows simple logic:
-- If database file exists, check if it has tables
+- If database file exists and is at the current schema version, leave it
+- If it has tables of an older schema version, migrate it
 - If database file doesn't exist or is empty, create it and initialize tables
 """
 
@@ -17,11 +18,251 @@ from src.config import CHAINS, get_db_path
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Stored in PRAGMA user_version once the tables are created
+SCHEMA_VERSION = 2
+
+# Schema statements, run one by one inside the init_db transaction.
+# Tables keyed only by a composite primary key are WITHOUT ROWID, so each is
+# stored as a single B-tree on that key instead of a rowid table plus an index
+DDL_STMTS = (
+    """
+    CREATE TABLE IF NOT EXISTS Chain (
+        chain_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Token (
+        token_address TEXT NOT NULL,
+        chain_id INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        decimals INTEGER NOT NULL,
+        PRIMARY KEY (token_address, chain_id),
+        FOREIGN KEY (chain_id) REFERENCES Chain(chain_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Route (
+        route_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        origin_chain_id INTEGER NOT NULL,
+        destination_chain_id INTEGER NOT NULL,
+        input_token TEXT NOT NULL,
+        output_token TEXT NOT NULL,
+        token_symbol TEXT NOT NULL,
+        discovery_timestamp INTEGER NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        FOREIGN KEY (origin_chain_id) REFERENCES Chain(chain_id),
+        FOREIGN KEY (destination_chain_id) REFERENCES Chain(chain_id),
+        FOREIGN KEY (input_token, origin_chain_id) REFERENCES Token(token_address, chain_id),
+        FOREIGN KEY (output_token, destination_chain_id) REFERENCES Token(token_address, chain_id),
+        UNIQUE(origin_chain_id, destination_chain_id, input_token, output_token)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_route_destchain_active
+        ON Route(destination_chain_id, is_active, output_token)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Fill (
+        tx_hash TEXT PRIMARY KEY,
+        is_success BOOLEAN DEFAULT TRUE,
+        route_id INTEGER NOT NULL,
+        depositor TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        exclusive_relayer TEXT NOT NULL,
+        input_token TEXT NOT NULL,
+        output_token TEXT NOT NULL,
+        input_amount TEXT NOT NULL,
+        output_amount TEXT NOT NULL,
+        origin_chain_id INTEGER NOT NULL,
+        destination_chain_id INTEGER NOT NULL,
+        deposit_id TEXT NOT NULL,
+        fill_deadline INTEGER,
+        exclusivity_deadline INTEGER,
+        message TEXT,
+        repayment_chain_id INTEGER,
+        repayment_address TEXT,
+        gas_cost TEXT,
+        gas_price TEXT,
+        block_number INTEGER NOT NULL,
+        tx_timestamp INTEGER NOT NULL,
+        deposit_block_number INTEGER,
+        deposit_timestamp INTEGER,
+        lp_fee TEXT,
+        bundle_id TEXT,
+        is_return BOOLEAN DEFAULT FALSE,
+        enrichment_attempts INTEGER NOT NULL DEFAULT 0,  -- Runs that found no deposit event
+        last_enrichment_attempt INTEGER,                 -- Time of the last such run
+        FOREIGN KEY (route_id) REFERENCES Route(route_id),
+        FOREIGN KEY (repayment_chain_id) REFERENCES Chain(chain_id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fill_origin_deposit
+        ON Fill(origin_chain_id, deposit_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fill_origin_deposit_block
+        ON Fill(origin_chain_id, deposit_block_number)
+    """,
+    # A bundle's fills are the successful fills repaid on its chain within
+    # its block range, so this turns that lookup into a range seek
+    """
+    CREATE INDEX IF NOT EXISTS idx_fill_repayment_block
+        ON Fill(repayment_chain_id, block_number)
+        WHERE is_success = 1
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fill_pending_enrichment
+        ON Fill(tx_hash)
+        WHERE is_success = 1 AND (deposit_timestamp IS NULL OR lp_fee IS NULL)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Return (
+        tx_hash TEXT NOT NULL,
+        return_chain_id INTEGER NOT NULL,
+        return_token TEXT NOT NULL,
+        return_amount TEXT NOT NULL,
+        root_bundle_id INTEGER NOT NULL,
+        leaf_id INTEGER NOT NULL,
+        refund_address TEXT NOT NULL,
+        is_deferred BOOLEAN NOT NULL,
+        caller TEXT NOT NULL,
+        block_number INTEGER NOT NULL,
+        tx_timestamp INTEGER NOT NULL,
+        PRIMARY KEY (tx_hash, return_token, refund_address),
+        FOREIGN KEY (return_chain_id) REFERENCES Chain(chain_id),
+        FOREIGN KEY (return_token, return_chain_id) REFERENCES Token(token_address, chain_id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_return_bundle
+        ON Return(root_bundle_id, return_chain_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Bundle (
+        bundle_id INTEGER NOT NULL,
+        chain_id INTEGER NOT NULL,
+        relayer_refund_root TEXT NOT NULL,
+        end_block INTEGER NOT NULL,
+        processed_timestamp INTEGER,
+        propose_timestamp INTEGER,      -- When ProposeRootBundle tx landed on Ethereum
+        settlement_timestamp INTEGER,   -- When RelayedRootBundle tx landed on destination
+        PRIMARY KEY (bundle_id, chain_id),
+        FOREIGN KEY (chain_id) REFERENCES Chain(chain_id)
+    ) WITHOUT ROWID
+    """,
+    # The primary key starts with bundle_id, so the per-chain latest bundle
+    # lookup needs its own index to be a single seek
+    """
+    CREATE INDEX IF NOT EXISTS idx_bundle_chain_bundle
+        ON Bundle(chain_id, bundle_id DESC, end_block)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS BundleReturn (
+        bundle_id INTEGER NOT NULL,
+        chain_id INTEGER NOT NULL,
+        token_address TEXT NOT NULL,
+        token_symbol TEXT NOT NULL,
+        input_amount DECIMAL(36,18) NOT NULL DEFAULT 0,
+        return_amount DECIMAL(36,18) NOT NULL DEFAULT 0,
+        lp_fee DECIMAL(36,18) NOT NULL DEFAULT 0,
+        start_block INTEGER NOT NULL,
+        end_block INTEGER NOT NULL,
+        start_time INTEGER NOT NULL,
+        end_time INTEGER NOT NULL,
+        fill_tx_hashes TEXT,  -- Comma-separated list of fill transaction hashes
+        return_tx_hash TEXT,  -- Single transaction hash for the return
+        relayer_refund_root TEXT,
+        propose_settlement_time_diff INTEGER,  -- Time difference in seconds between propose and settlement
+        created_at INTEGER NOT NULL DEFAULT (unixepoch()),
+        PRIMARY KEY (bundle_id, chain_id, token_address),
+        FOREIGN KEY (chain_id) REFERENCES Chain(chain_id),
+        FOREIGN KEY (token_address, chain_id) REFERENCES Token(token_address, chain_id)
+    ) WITHOUT ROWID
+    """,
+    # New tables for profit tracking
+    """
+    CREATE TABLE IF NOT EXISTS TokenPrice (
+        date DATE,
+        token_symbol TEXT,
+        price_usd DECIMAL,
+        PRIMARY KEY (date, token_symbol)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS DailyProfit (
+        date DATE,
+        chain_id INTEGER,
+        token_symbol TEXT,
+        success_input_amount DECIMAL,
+        success_output_amount DECIMAL,
+        success_lp_fee DECIMAL,
+        success_gas_fee_eth DECIMAL,
+        success_gas_fee_usd DECIMAL,
+        all_input_amount DECIMAL,
+        all_output_amount DECIMAL,
+        all_lp_fee DECIMAL,
+        all_gas_fee_eth DECIMAL,
+        all_gas_fee_usd DECIMAL,
+        total_fills INTEGER,
+        successful_fills INTEGER,
+        profit_usd DECIMAL,
+        PRIMARY KEY (date, chain_id, token_symbol),
+        FOREIGN KEY (chain_id) REFERENCES Chain(chain_id)
+    )
+    """,
+)
+
+
+# Columns added to existing tables after their first release, as
+# (table, column, definition). New databases get them from DDL_STMTS
+ADDED_COLUMNS = (
+    ("Fill", "deposit_block_number", "INTEGER"),
+    ("Fill", "enrichment_attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("Fill", "last_enrichment_attempt", "INTEGER"),
+    ("Bundle", "propose_timestamp", "INTEGER"),
+    ("Bundle", "settlement_timestamp", "INTEGER"),
+    ("BundleReturn", "propose_settlement_time_diff", "INTEGER"),
+)
+
+
+def migrate_db(conn: sqlite3.Connection) -> None:
+    """
+    Bring a database created before SCHEMA_VERSION up to date.
+
+    Adds the missing columns and creates the indexes of DDL_STMTS, then
+    stamps the schema version, in one transaction. Tables that are WITHOUT
+    ROWID in new databases keep their rowid layout, since that would need a
+    full table rebuild.
+
+    Args:
+        conn: Open connection to the database to migrate
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for table, column, definition in ADDED_COLUMNS:
+            cursor.execute(f"PRAGMA table_info({table})")
+            if column not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+        for stmt in DDL_STMTS:
+            if stmt.lstrip().startswith("CREATE INDEX"):
+                cursor.execute(stmt)
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
 
 def init_db():
     """
     Simple database initialization logic:
-    - If database file exists, check if it has tables
+    - If database file exists and is at the current schema version, leave it
+    - If it has tables of an older schema version, migrate it
     - If database file doesn't exist or is empty, create it and initialize tables
     """
     logger.info("=" * 80)
@@ -38,14 +279,33 @@ def init_db():
     tables_exist = False
 
     if file_exists:
-        # Check if database has tables
         conn = sqlite3.connect(db_file)
         cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        conn.close()
+        # Databases created by this script carry the schema version, which
+        # is read from the header; older ones are checked for any table
+        cursor.execute("PRAGMA user_version")
+        schema_version = cursor.fetchone()[0]
+        if schema_version >= SCHEMA_VERSION:
+            tables_exist = True
+        else:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' LIMIT 1")
+            tables_exist = cursor.fetchone() is not None
 
-        tables_exist = len(tables) > 0
+        # Tables of an older schema version are migrated in place
+        if tables_exist and schema_version < SCHEMA_VERSION:
+            logger.info(
+                f"Migrating database file {db_file} from schema version "
+                f"{schema_version} to {SCHEMA_VERSION}"
+            )
+            try:
+                migrate_db(conn)
+            except sqlite3.Error as e:
+                logger.error(f"Error migrating database: {e}")
+                sys.exit(1)
+            finally:
+                conn.close()
+            return
+        conn.close()
 
     # If database exists and has tables, do nothing
     if file_exists and tables_exist:
@@ -63,153 +323,27 @@ def init_db():
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
 
+    # The page size can only change outside WAL, and is applied to a file
+    # that already has pages by VACUUM. The database has no tables yet, so
+    # this is cheap; 8 KiB pages fit the wide Fill rows better than 4 KiB
+    cursor.execute("PRAGMA journal_mode=DELETE")
+    cursor.execute("PRAGMA page_size=8192")
+    cursor.execute("VACUUM")
+
+    # WAL is persistent, so every later connection to the new database uses it
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+
     try:
         logger.info("Initializing database tables")
 
-        # Create tables based on the new schema
-        cursor.executescript("""
-        CREATE TABLE IF NOT EXISTS Chain (
-            chain_id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS Token (
-            token_address TEXT NOT NULL,
-            chain_id INTEGER NOT NULL,
-            symbol TEXT NOT NULL,
-            decimals INTEGER NOT NULL,
-            PRIMARY KEY (token_address, chain_id),
-            FOREIGN KEY (chain_id) REFERENCES Chain(chain_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS Route (
-            route_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            origin_chain_id INTEGER NOT NULL,
-            destination_chain_id INTEGER NOT NULL,
-            input_token TEXT NOT NULL,
-            output_token TEXT NOT NULL,
-            token_symbol TEXT NOT NULL,
-            discovery_timestamp INTEGER NOT NULL,
-            is_active BOOLEAN DEFAULT TRUE,
-            FOREIGN KEY (origin_chain_id) REFERENCES Chain(chain_id),
-            FOREIGN KEY (destination_chain_id) REFERENCES Chain(chain_id),
-            FOREIGN KEY (input_token, origin_chain_id) REFERENCES Token(token_address, chain_id),
-            FOREIGN KEY (output_token, destination_chain_id) REFERENCES Token(token_address, chain_id),
-            UNIQUE(origin_chain_id, destination_chain_id, input_token, output_token)
-        );
-
-        CREATE TABLE IF NOT EXISTS Fill (
-            tx_hash TEXT PRIMARY KEY,
-            is_success BOOLEAN DEFAULT TRUE,
-            route_id INTEGER NOT NULL,
-            depositor TEXT NOT NULL,
-            recipient TEXT NOT NULL,
-            exclusive_relayer TEXT NOT NULL,
-            input_token TEXT NOT NULL,
-            output_token TEXT NOT NULL,
-            input_amount TEXT NOT NULL,
-            output_amount TEXT NOT NULL,
-            origin_chain_id INTEGER NOT NULL,
-            destination_chain_id INTEGER NOT NULL,
-            deposit_id TEXT NOT NULL,
-            fill_deadline INTEGER,
-            exclusivity_deadline INTEGER,
-            message TEXT,
-            repayment_chain_id INTEGER,
-            repayment_address TEXT,
-            gas_cost TEXT,
-            gas_price TEXT,
-            block_number INTEGER NOT NULL,
-            tx_timestamp INTEGER NOT NULL,
-            deposit_block_number INTEGER,
-            deposit_timestamp INTEGER,
-            lp_fee TEXT,
-            bundle_id TEXT,
-            is_return BOOLEAN DEFAULT FALSE,
-            FOREIGN KEY (route_id) REFERENCES Route(route_id),
-            FOREIGN KEY (repayment_chain_id) REFERENCES Chain(chain_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS Return (
-            tx_hash TEXT NOT NULL,
-            return_chain_id INTEGER NOT NULL,
-            return_token TEXT NOT NULL,
-            return_amount TEXT NOT NULL,
-            root_bundle_id INTEGER NOT NULL,
-            leaf_id INTEGER NOT NULL,
-            refund_address TEXT NOT NULL,
-            is_deferred BOOLEAN NOT NULL,
-            caller TEXT NOT NULL,
-            block_number INTEGER NOT NULL,
-            tx_timestamp INTEGER NOT NULL,
-            PRIMARY KEY (tx_hash, return_token, refund_address),
-            FOREIGN KEY (return_chain_id) REFERENCES Chain(chain_id),
-            FOREIGN KEY (return_token, return_chain_id) REFERENCES Token(token_address, chain_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS Bundle (
-            bundle_id INTEGER NOT NULL,
-            chain_id INTEGER NOT NULL,
-            relayer_refund_root TEXT NOT NULL,
-            end_block INTEGER NOT NULL,
-            processed_timestamp INTEGER,
-            propose_timestamp INTEGER,      -- When ProposeRootBundle tx landed on Ethereum
-            settlement_timestamp INTEGER,   -- When RelayedRootBundle tx landed on destination
-            PRIMARY KEY (bundle_id, chain_id),
-            FOREIGN KEY (chain_id) REFERENCES Chain(chain_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS BundleReturn (
-            bundle_id INTEGER NOT NULL,
-            chain_id INTEGER NOT NULL,
-            token_address TEXT NOT NULL,
-            token_symbol TEXT NOT NULL,
-            input_amount DECIMAL(36,18) NOT NULL DEFAULT 0,
-            return_amount DECIMAL(36,18) NOT NULL DEFAULT 0,
-            lp_fee DECIMAL(36,18) NOT NULL DEFAULT 0,
-            start_block INTEGER NOT NULL,
-            end_block INTEGER NOT NULL,
-            start_time INTEGER NOT NULL,
-            end_time INTEGER NOT NULL,
-            fill_tx_hashes TEXT,  -- Comma-separated list of fill transaction hashes
-            return_tx_hash TEXT,  -- Single transaction hash for the return
-            relayer_refund_root TEXT,
-            propose_settlement_time_diff INTEGER,  -- Time difference in seconds between propose and settlement
-            created_at INTEGER NOT NULL DEFAULT (unixepoch()),
-            PRIMARY KEY (bundle_id, chain_id, token_address),
-            FOREIGN KEY (chain_id) REFERENCES Chain(chain_id),
-            FOREIGN KEY (token_address, chain_id) REFERENCES Token(token_address, chain_id)
-        );
-
-        -- New tables for profit tracking
-        CREATE TABLE IF NOT EXISTS TokenPrice (
-            date DATE,
-            token_symbol TEXT,
-            price_usd DECIMAL,
-            PRIMARY KEY (date, token_symbol)
-        );
-
-        CREATE TABLE IF NOT EXISTS DailyProfit (
-            date DATE,
-            chain_id INTEGER,
-            token_symbol TEXT,
-            success_input_amount DECIMAL,
-            success_output_amount DECIMAL,
-            success_lp_fee DECIMAL,
-            success_gas_fee_eth DECIMAL,
-            success_gas_fee_usd DECIMAL,
-            all_input_amount DECIMAL,
-            all_output_amount DECIMAL,
-            all_lp_fee DECIMAL,
-            all_gas_fee_eth DECIMAL,
-            all_gas_fee_usd DECIMAL,
-            total_fills INTEGER,
-            successful_fills INTEGER,
-            profit_usd DECIMAL,
-            PRIMARY KEY (date, chain_id, token_symbol),
-            FOREIGN KEY (chain_id) REFERENCES Chain(chain_id)
-        );
-        """)
+        # Create the tables, seed the chains and stamp the schema version in
+        # one transaction, so the database is written with a single commit.
+        # executescript() would commit on its own, so the schema statements
+        # run through execute() instead
+        cursor.execute("BEGIN IMMEDIATE")
+        for stmt in DDL_STMTS:
+            cursor.execute(stmt)
 
         # Insert chain data
         insert_chain_sql = """
@@ -219,7 +353,8 @@ def init_db():
             (?, ?)
         """
 
-        # Insert each chain from config
+        # Collect the chains from config and insert them in one statement
+        chain_rows = []
         for chain in CHAINS:
             # Skip chains with missing required data
             if not all([chain.get("chain_id"), chain.get("name")]):
@@ -228,16 +363,17 @@ def init_db():
                 )
                 continue
 
-            chain_data = (
-                int(chain["chain_id"]),  # Store as integer
-                chain["name"],
+            chain_rows.append(
+                (
+                    int(chain["chain_id"]),  # Store as integer
+                    chain["name"],
+                )
             )
 
-            cursor.execute(insert_chain_sql, chain_data)
-            logger.info(
-                f"Inserted chain data for {chain['name']} (Chain ID: {chain['chain_id']})"
-            )
+        cursor.executemany(insert_chain_sql, chain_rows)
+        logger.info(f"Inserted chain data for {len(chain_rows)} chains")
 
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         logger.info("Database tables created successfully")
 
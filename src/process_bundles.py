@@ -9,139 +9,162 @@ This module handles the processing of bundle events by:
 """
 
 import logging
+import sqlite3
 import time
-from typing import Dict, List, cast
-
-from src.config import CHAINS
-from src.db_utils import get_db_connection
-from src.web3_utils import get_hub_contract, get_spokepool_contracts, get_block_timestamp
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple, cast
+
+from src.config import CHAINS, CHAINS_BY_ID
+from src.db_utils import get_db_connection, optimize_and_close
+from src.web3_utils import (
+    fetch_in_block_windows,
+    get_block_timestamp,
+    get_hub_contract,
+    get_spoke_event_topic,
+    get_spokepool_contracts,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# topic0 of the spoke pool RelayedRootBundle event
+RELAYED_ROOT_BUNDLE_TOPIC = get_spoke_event_topic("RelayedRootBundle")
+
 
-def get_last_processed_bundle(chain_id: int) -> int:
+def get_resume_point(
+    chain_id: int, conn: sqlite3.Connection
+) -> Tuple[Optional[int], int, int]:
     """
-    Retrieves the most recently processed bundle ID for a specific chain.
+    Retrieves where bundle processing for a chain resumes, in one query.
 
-    This function:
-    1. Queries the Bundle table for the highest bundle_id for the given chain
-    2. If no bundles exist, returns the chain's configured start_block
-    3. Uses this information to determine where to resume bundle processing
+    The latest bundle of the chain is found with a seek on
+    idx_bundle_chain_bundle, and the Ethereum end block of the same bundle
+    with a primary key lookup.
 
     Args:
-        chain_id: The numeric ID of the chain to query (e.g. 1 for Ethereum)
+        chain_id: The numeric ID of the chain to query
+        conn: Open database connection to use
 
     Returns:
-        int: The highest processed bundle ID if bundles exist,
-             or the chain's start_block if no bundles exist,
-             or 0 if no configuration exists
+        Tuple of (last bundle ID or None if the chain has no bundles yet,
+        its end block on the chain, its end block on Ethereum), where
+        missing end blocks fall back to the chains' configured start_block
     """
-    conn = get_db_connection()
-    if not conn:
-        return 0
-
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT MAX(bundle_id) FROM Bundle WHERE chain_id = ?", (chain_id,)
-        )
-        result = cursor.fetchone()
-
-        if result and result[0] is not None:
-            return cast(int, result[0])
-
-        # If no bundles exist, get start_block from chain config
-        chain = next((c for c in CHAINS if c["chain_id"] == chain_id), None)
-        if chain and "start_block" in chain:
-            return cast(int, chain["start_block"])
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT b.bundle_id,
+               b.end_block,
+               (SELECT e.end_block FROM Bundle e
+                WHERE e.bundle_id = b.bundle_id AND e.chain_id = 1)
+        FROM Bundle b
+        WHERE b.chain_id = ?
+        ORDER BY b.bundle_id DESC
+        LIMIT 1
+        """,
+        (chain_id,),
+    )
+    result = cursor.fetchone()
+    if result:
+        last_bundle_id, end_block, eth_end_block = result
+    else:
+        last_bundle_id, end_block, eth_end_block = None, None, None
 
-        logger.error(f"No start_block configured for chain {chain_id}")
-        return 0
+    if end_block is None:
+        end_block = CHAINS_BY_ID.get(chain_id, {}).get("start_block", 0)
+    if eth_end_block is None:
+        eth_end_block = CHAINS_BY_ID.get(1, {}).get("start_block", 0)
 
-    except Exception as e:
-        logger.error(f"Error getting last bundle for chain {chain_id}: {str(e)}")
-        return 0
-    finally:
-        conn.close()
+    return last_bundle_id, cast(int, end_block), cast(int, eth_end_block)
 
 
-def get_last_bundle_end_block(bundle_id: int, chain_id: int) -> int:
+def get_event_logs(
+    event, from_block: int, to_block: int, argument_filters: Optional[Dict] = None
+) -> List:
     """
-    Retrieves the end block number associated with a specific bundle ID for a chain.
-
-    This function is used to:
-    1. Find the block range for processing new bundles
-    2. Determine where to resume processing after interruptions
-    3. Track bundle evaluation block numbers across chains
-
-    If no bundle exists (end_block = 0), returns the chain's configured start_block
-    as the starting point for processing.
+    Fetch the decoded logs of a contract event over a block range.
 
     Args:
-        bundle_id: The bundle ID to look up
-        chain_id: The numeric ID of the chain to get the end block for
+        event: Contract event to fetch, e.g. hub_contract.events.ProposeRootBundle
+        from_block: First block to search (inclusive)
+        to_block: Last block to search (inclusive)
+        argument_filters: Values of indexed event arguments to filter on
 
     Returns:
-        int: The end block number for the bundle if found,
-             or the chain's configured start_block if no bundle exists
-
-    Note:
-        The end block represents the block number used for bundle evaluation
-        on the specified chain, as determined by the hub contract
+        List of decoded events in block order
     """
-
-    logger.info(
-        f"Getting last bundle end block for bundle {bundle_id} on chain {chain_id}"
+    return fetch_in_block_windows(
+        lambda window_start, window_end: event.get_logs(
+            from_block=window_start,
+            to_block=window_end,
+            argument_filters=argument_filters,
+        ),
+        from_block,
+        to_block,
     )
 
-    conn = get_db_connection()
-    if not conn:
-        return 0
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT end_block FROM Bundle WHERE bundle_id = ? AND chain_id = ?",
-            (bundle_id, chain_id),
-        )
-        result = cursor.fetchone()
+def get_relayed_root_bundle_logs(
+    contract, from_block: int, to_block: int, relayer_roots: List[bytes]
+) -> List[Dict]:
+    """
+    Fetch RelayedRootBundle logs for the given relayer refund roots and decode them.
 
-        # Check if we got a result row and if end_block is not None
-        if result is not None and result[0] is not None:
-            return cast(int, result[0])
+    All the fields used here are indexed, so they are read straight from the
+    raw log topics instead of running every log through the full ABI decoder:
+    - rootBundleId is the first indexed argument (topics[1])
+    - relayerRefundRoot is the second indexed argument (topics[2])
+    Logs whose root isn't one of relayer_roots are dropped, in case the
+    provider doesn't apply the topic filter.
 
-        # If no bundle exists, get start_block from chain config
-        chain = next((c for c in CHAINS if c["chain_id"] == chain_id), None)
-        if chain and "start_block" in chain:
-            logger.info(
-                f"No existing bundles found for chain {chain_id}, using start_block from config"
-            )
-            return cast(int, chain["start_block"])
+    Args:
+        contract: Spoke pool contract of the chain
+        from_block: First block to search (inclusive)
+        to_block: Last block to search (inclusive)
+        relayer_roots: Relayer refund roots to filter on
 
-        logger.error(f"No start_block configured for chain {chain_id}")
-        return 0
+    Returns:
+        List of event-like dicts with args.rootBundleId, args.relayerRefundRoot
+        and blockNumber
+    """
+    root_set = {bytes(root) for root in relayer_roots}
+    logs = contract.w3.eth.get_logs(
+        {
+            "address": contract.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [
+                RELAYED_ROOT_BUNDLE_TOPIC,
+                None,  # rootBundleId
+                ["0x" + root.hex() for root in root_set],
+            ],
+        }
+    )
 
-    except Exception as e:
-        logger.error(
-            f"Error getting block for bundle {bundle_id} on chain {chain_id}: {str(e)}"
-        )
-        return 0
-    finally:
-        conn.close()
+    return [
+        {
+            "args": {
+                "rootBundleId": int.from_bytes(log["topics"][1], "big"),
+                "relayerRefundRoot": bytes(log["topics"][2]),
+            },
+            "blockNumber": log["blockNumber"],
+        }
+        for log in logs
+        if bytes(log["topics"][2]) in root_set
+    ]
 
 
 def get_spoke_bundle_events(
-    chain_id: int, relayer_roots: List[str], start_block: int
+    chain_id: int, contract, relayer_roots: List[bytes], start_block: int
 ) -> List[Dict]:
     """
     Fetches RelayedRootBundle events from a spoke contract that match specific relayer roots.
 
     This function:
-    1. Gets the appropriate spoke contract for the chain
-    2. Creates an event filter starting from the specified block
-    3. Filters events to only those matching the provided relayer roots
-    4. Returns all matching events with their full data
+    1. Fetches events from the specified block in paginated block windows
+    2. Filters events to only those matching the provided relayer roots
+    3. Returns all matching events, decoded from the raw log topics
     
     Uses batching to avoid "exceed max topics" errors when filtering by many relayer roots.
 
@@ -152,6 +175,7 @@ def get_spoke_bundle_events(
 
     Args:
         chain_id: The numeric ID of the chain to get events from
+        contract: Web3 contract instance for the chain's spoke pool
         relayer_roots: List of relayer refund root hashes to filter by
         start_block: The block number to start searching from
 
@@ -159,13 +183,8 @@ def get_spoke_bundle_events(
         List[Dict]: List of matching event data dictionaries,
                    or empty list if no events found or error occurs
     """
-    contracts = get_spokepool_contracts()
-    if chain_id not in contracts:
-        logger.error(f"No spoke contract for chain {chain_id}")
-        return []
-
     try:
-        contract = contracts[chain_id]
+        current_block = contract.w3.eth.block_number
         
         # Batch relayer roots to avoid "exceed max topics" error
         # RPC providers typically limit topic filters to 100-1000 values
@@ -177,10 +196,13 @@ def get_spoke_bundle_events(
             batch = relayer_roots[i:i + BATCH_SIZE]
             
             try:
-                events = contract.events.RelayedRootBundle.create_filter(
-                    from_block=start_block,
-                    argument_filters={"relayerRefundRoot": batch},
-                ).get_all_entries()
+                events = fetch_in_block_windows(
+                    lambda window_start, window_end: get_relayed_root_bundle_logs(
+                        contract, window_start, window_end, batch
+                    ),
+                    start_block,
+                    current_block,
+                )
                 
                 all_events.extend(events)
                 
@@ -198,7 +220,7 @@ def get_spoke_bundle_events(
         return []
 
 
-def process_chain_bundles(chain_id: int, hub_contract) -> None:
+def process_chain_bundles(chain_id: int, hub_contract, spoke_contract) -> None:
     """
     Find the last bundle processed for a chain, and process all new bundles from there.
     Processes and stores bundle information for a specific chain by matching hub and spoke events.
@@ -231,28 +253,50 @@ def process_chain_bundles(chain_id: int, hub_contract) -> None:
 
     logger.info(f"* Processing bundles for chain {chain_id}")
 
-    chain = next((c for c in CHAINS if c["chain_id"] == chain_id), None)
+    chain = CHAINS_BY_ID.get(chain_id)
     if not chain:
         logger.error(f"No configuration found for chain {chain_id}")
         return
 
-    # Get the last processed bundle id
-    last_bundle_id = get_last_processed_bundle(chain_id)
-    # Get the end_block for the last processed bundle.
-    last_bundle_end_block = get_last_bundle_end_block(last_bundle_id, chain_id) + 1
-    last_eth_bundle_end_block = get_last_bundle_end_block(
-        last_bundle_id, 1
-    )  # Ethereum chain ID is 1
+    # One connection for the lookups and the inserts of this chain
+    conn = get_db_connection()
+    if not conn:
+        return
+
+    # Get the last processed bundle id and its end blocks on this chain and
+    # on Ethereum (chain ID 1)
+    try:
+        last_bundle_id, last_bundle_end_block, last_eth_bundle_end_block = (
+            get_resume_point(chain_id, conn)
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Error getting last bundle for chain {chain_id}: {str(e)}")
+        optimize_and_close(conn)
+        return
+    last_bundle_end_block += 1
 
     logger.info(
         f"(Last bundle endblock: {last_bundle_end_block}, last bundle eth endblock: {last_eth_bundle_end_block})"
     )
     try:
         # From eth hub contract, get all ProposeRootBundle events from the last processed bundle endblock
-        # Todo: Pagination
-        propose_events = hub_contract.events.ProposeRootBundle.create_filter(
-            from_block=last_eth_bundle_end_block
-        ).get_all_entries()
+        propose_events = get_event_logs(
+            hub_contract.events.ProposeRootBundle,
+            last_eth_bundle_end_block,
+            hub_contract.w3.eth.block_number,
+        )
+
+        # The search starts at the Ethereum end block of the last bundle, so
+        # it also returns proposals that are already stored (at least the
+        # last bundle's own). Drop proposals that end before this chain's
+        # resume block before any spoke or timestamp lookups are made for them
+        bundle_block_index = chain["bundle_block_index"]
+        propose_events = [
+            event
+            for event in propose_events
+            if event["args"]["bundleEvaluationBlockNumbers"][bundle_block_index]
+            >= last_bundle_end_block
+        ]
 
         if not propose_events:
             logger.info("No new hub events found")
@@ -263,98 +307,105 @@ def process_chain_bundles(chain_id: int, hub_contract) -> None:
 
         # From spoke contract, get all RelayedRootBundle events that match the relayer roots
         bundle_events = get_spoke_bundle_events(
-            chain_id, relayer_roots, last_bundle_end_block
+            chain_id, spoke_contract, relayer_roots, last_bundle_end_block
         )
 
         if not bundle_events:
             logger.info(f"No matching spoke events found for chain {chain_id}")
             return
 
-        # Process matching events
-        conn = get_db_connection()
-        if not conn:
-            return
+        # Pull the fields used below out of the events once, so the loop
+        # works on plain tuples instead of nested AttributeDict lookups
+        get_root = itemgetter("relayerRefundRoot")
+        get_bundle_eval_block_numbers = itemgetter("bundleEvaluationBlockNumbers")
+        get_root_bundle_id = itemgetter("rootBundleId")
+
+        # (relayer refund root, end block on this chain, Ethereum block)
+        propose_tuples = [
+            (
+                get_root(event["args"]),
+                get_bundle_eval_block_numbers(event["args"])[bundle_block_index],
+                event["blockNumber"],
+            )
+            for event in propose_events
+        ]
+
+        # Index spoke events by relayer refund root, keeping the first event
+        # for each root, so every hub event is matched with one dict lookup
+        spoke_by_root: Dict[bytes, Tuple[int, int]] = {}
+        for bundle_event in bundle_events:
+            spoke_by_root.setdefault(
+                get_root(bundle_event["args"]),
+                (get_root_bundle_id(bundle_event["args"]), bundle_event["blockNumber"]),
+            )
 
+        # Process matching events
         try:
             cursor = conn.cursor()
-            bundles_processed = 0
-            latest_bundle_id = last_bundle_id
+            latest_bundle_id = last_bundle_id if last_bundle_id is not None else 0
+
+            # Bundle rows collected here and inserted with one executemany
+            bundle_rows = []
+            processed_timestamp = int(time.time())
+
+            # source: https://github.com/UMAprotocol/UMIPs/blob/master/UMIPs/umip-179.md
+            # A Root Bundle Proposal shall consist of the following:
+            # 1. relayerRefundRoot:
+            # Merkle Root of RelayerRefundLeaf objects of the proposal.
+            # 2. bundleEvaluationBlockNumbers
+            # The ordered array of block numbers signifying the end block of the proposal for each respective chainId.
 
             # Iterate through each ProposeRootBundle event from the Ethereum hub contract
-            for propose_event in propose_events:
+            for relayer_root, bundle_end_block, propose_block in propose_tuples:
                 # Find the matching RelayedRootBundle event from the spoke chain by comparing relayer refund roots
                 # The relayer refund root uniquely identifies a bundle across chains
-                matching_spoke_event = next(
+                matching_spoke = spoke_by_root.get(relayer_root)
+                if matching_spoke is None:
+                    continue
+                bundle_id, settlement_block = matching_spoke
+
+                bundle_rows.append(
                     (
-                        e
-                        for e in bundle_events
-                        if e["args"]["relayerRefundRoot"]
-                        == propose_event["args"]["relayerRefundRoot"]
-                    ),
-                    None,
+                        bundle_id,
+                        chain_id,
+                        relayer_root.hex(),
+                        bundle_end_block,
+                        processed_timestamp,
+                        get_block_timestamp(1, propose_block),  # Ethereum is chain_id 1
+                        get_block_timestamp(chain_id, settlement_block),
+                    )
                 )
-
-                # source: https://github.com/UMAprotocol/UMIPs/blob/master/UMIPs/umip-179.md
-                # A Root Bundle Proposal shall consist of the following:
-                # 1. relayerRefundRoot:
-                # Merkle Root of RelayerRefundLeaf objects of the proposal.
-                # 2. bundleEvaluationBlockNumbers
-                # The ordered array of block numbers signifying the end block of the proposal for each respective chainId.
-
-                if matching_spoke_event:
-                    # Extract the bundle ID from the spoke event
-                    bundle_id = matching_spoke_event["args"]["rootBundleId"]
-
-                    # Get bundle evaluation block numbers
-                    bundle_eval_block_numbers = propose_event["args"]["bundleEvaluationBlockNumbers"]
-                    bundle_block_index = chain["bundle_block_index"]
-                    bundle_end_block = bundle_eval_block_numbers[bundle_block_index]
-
-                    # Get propose and settlement timestamps
-                    propose_timestamp = get_block_timestamp(1, propose_event["blockNumber"])  # Ethereum is chain_id 1
-                    settlement_timestamp = get_block_timestamp(chain_id, matching_spoke_event["blockNumber"])
-
-                    if bundle_end_block >= last_bundle_end_block:
-                        # Insert bundle record
-                        cursor.execute(
-                            '''
-                            INSERT INTO Bundle (
-                                bundle_id,
-                                chain_id,
-                                relayer_refund_root,
-                                end_block,
-                                processed_timestamp,
-                                propose_timestamp,
-                                settlement_timestamp
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ''',
-                            (
-                                bundle_id,
-                                chain_id,
-                                propose_event["args"]["relayerRefundRoot"].hex(),
-                                bundle_end_block,
-                                int(time.time()),
-                                propose_timestamp,
-                                settlement_timestamp,
-                            ),
-                        )
-                        bundles_processed += 1
-                        latest_bundle_id = max(latest_bundle_id, bundle_id)
-
+                latest_bundle_id = max(latest_bundle_id, bundle_id)
+
+            # Insert all bundle records in one statement and one transaction
+            cursor.executemany(
+                '''
+                INSERT INTO Bundle (
+                    bundle_id,
+                    chain_id,
+                    relayer_refund_root,
+                    end_block,
+                    processed_timestamp,
+                    propose_timestamp,
+                    settlement_timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''',
+                bundle_rows,
+            )
             conn.commit()
             logger.info(
-                f"Processed {bundles_processed} bundles for chain {chain_id}. "
+                f"Processed {len(bundle_rows)} bundles for chain {chain_id}. "
                 f"Latest bundle ID: {latest_bundle_id}"
             )
 
         except Exception as e:
             logger.error(f"Error processing bundles for chain {chain_id}: {str(e)}")
             conn.rollback()
-        finally:
-            conn.close()
 
     except Exception as e:
         logger.error(f"Error getting events for chain {chain_id}: {str(e)}")
+    finally:
+        optimize_and_close(conn)
 
 
 def process_bundles() -> None:
@@ -364,7 +415,8 @@ def process_bundles() -> None:
     This function:
     1. Initializes hub and spoke contract connections
     2. Iterates through all configured chains
-    3. Processes bundles for each chain that has a valid spoke contract
+    3. Processes bundles for each chain that has a valid spoke contract,
+       with the chains running concurrently in worker threads
     4. Logs the overall processing status and any errors
 
     The process ensures:
@@ -388,14 +440,27 @@ def process_bundles() -> None:
         logger.error("Could not initialize spoke contracts")
         return
 
-    # Process each chain
+    chain_ids = []
     for chain in CHAINS:
         chain_id = cast(int, chain["chain_id"])
         if chain_id in spoke_contracts:
-            process_chain_bundles(chain_id, hub_contract)
+            chain_ids.append(chain_id)
         else:
             logger.warning(f"No spoke contract for chain {chain_id}")
 
+    # Process the chains in parallel; their time is spent waiting on RPC
+    # calls, and each chain uses its own database connection
+    if chain_ids:
+        with ThreadPoolExecutor(max_workers=len(chain_ids)) as executor:
+            list(
+                executor.map(
+                    lambda chain_id: process_chain_bundles(
+                        chain_id, hub_contract, spoke_contracts[chain_id]
+                    ),
+                    chain_ids,
+                )
+            )
+
     logger.info("Bundle processing complete")
 
 
@@ -12,17 +12,38 @@ This module:
 import logging
 import sqlite3
 from collections import defaultdict
-from decimal import Decimal
-from typing import Dict, List, Set, Tuple
+from typing import Dict, FrozenSet, List, Tuple
 
 from src.db_utils import get_db_connection
-from src.web3_utils import get_block_timestamp
+from src.web3_utils import get_block_timestamps
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+INSERT_BUNDLE_RETURN_SQL = """
+    INSERT INTO BundleReturn (
+        bundle_id,
+        chain_id,
+        token_address,
+        token_symbol,
+        input_amount,
+        return_amount,
+        lp_fee,
+        start_block,
+        end_block,
+        start_time,
+        end_time,
+        fill_tx_hashes,
+        return_tx_hash,
+        relayer_refund_root,
+        propose_settlement_time_diff
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
-def find_active_tokens(cursor: sqlite3.Cursor, chain_id: int) -> Set[Tuple[str, str]]:
+def find_active_tokens(
+    cursor: sqlite3.Cursor, chain_id: int
+) -> FrozenSet[Tuple[str, str]]:
     """
     Find active tokens for a chain by looking at Route table.
     A token is considered active if it's used in any route with this chain.
@@ -32,7 +53,8 @@ def find_active_tokens(cursor: sqlite3.Cursor, chain_id: int) -> Set[Tuple[str,
         chain_id: Chain ID to find tokens for
 
     Returns:
-        Set of (token_address, token_symbol) tuples that are active on this chain
+        Frozen set of (token_address, token_symbol) tuples that are active on
+        this chain
     """
     logger.info(f"Finding active tokens for chain {chain_id}...")
 
@@ -47,123 +69,142 @@ def find_active_tokens(cursor: sqlite3.Cursor, chain_id: int) -> Set[Tuple[str,
         (chain_id,),
     )
 
-    tokens = {(row[0], row[1]) for row in cursor.fetchall()}  # (address, symbol) pairs
+    tokens = frozenset((row[0], row[1]) for row in cursor.fetchall())  # (address, symbol) pairs
     logger.info(f"Found {len(tokens)} active tokens for chain {chain_id}")
     return tokens
 
 
+def get_bundle_block_ranges(
+    cursor: sqlite3.Cursor,
+) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """
+    Get the block range of every bundle with one scan of the Bundle table.
+
+    A bundle starts right after the highest end_block below its own on the
+    same chain. The window frame covers the rows with a smaller end_block
+    (RANGE ... 1 PRECEDING), so bundles sharing an end_block don't start
+    inside each other.
+
+    Args:
+        cursor: Database cursor
+
+    Returns:
+        Dict of (bundle_id, chain_id) to (start_block, end_block)
+    """
+    cursor.execute(
+        """
+        SELECT 
+            bundle_id,
+            chain_id,
+            COALESCE(
+                MAX(end_block) OVER (
+                    PARTITION BY chain_id
+                    ORDER BY end_block
+                    RANGE BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                ),
+                0
+            ) + 1 as start_block,
+            end_block
+        FROM Bundle
+    """
+    )
+
+    return {(row[0], row[1]): (row[2], row[3]) for row in cursor.fetchall()}
+
+
 def get_bundle_fills(
-    cursor: sqlite3.Cursor, bundle_id: int, chain_id: int, token_address: str
-) -> Tuple[List[Dict], int, int]:
+    cursor: sqlite3.Cursor, chain_id: int, start_block: int, end_block: int
+) -> Dict[str, Dict]:
     """
-    Get all fills that belong to this bundle for a specific token.
+    Get the fills that belong to a bundle, aggregated per token.
     A fill belongs to a bundle if:
     1. It's on the same chain (repayment_chain_id = chain_id)
-    2. It's for the specified token (output_token = token_address)
-    3. Its block_number is <= bundle's end_block
-    4. Its block_number is > previous bundle's end_block
+    2. Its block_number is within the bundle's block range
+
+    All tokens are read with one query in block order, and the fills are
+    grouped by output_token here. Amounts are returned as lists of the stored
+    strings rather than summed by SQLite, which would turn wei amounts above
+    2**63 into floats.
 
     Args:
         cursor: Database cursor
-        bundle_id: Bundle ID to get fills for
         chain_id: Chain ID (repayment chain)
-        token_address: Token address to filter fills
+        start_block: First block of the bundle (inclusive)
+        end_block: Last block of the bundle (inclusive)
 
     Returns:
-        Tuple of:
-        - List of fill records with input_amount, lp_fee, tx_hash, tx_timestamp
-        - Start block number
-        - End block number
+        Dict of output_token to its fills, with input_amounts, lp_fees and
+        tx_hashes lists in block order
     """
     logger.debug(
-        f"Getting fills for bundle {bundle_id} chain {chain_id} token {token_address}"
+        f"Getting fills for chain {chain_id} blocks {start_block}-{end_block}"
     )
 
     cursor.execute(
         """
-        WITH bundle_info AS (
-            -- Get this bundle's end_block and the previous bundle's end_block
-            SELECT 
-                b1.end_block as end_block,
-                COALESCE(MAX(b2.end_block), 0) as prev_end_block
-            FROM Bundle b1
-            LEFT JOIN Bundle b2 ON b2.chain_id = b1.chain_id 
-                AND b2.end_block < b1.end_block
-            WHERE b1.bundle_id = ? AND b1.chain_id = ?
-            GROUP BY b1.bundle_id, b1.chain_id
-        )
         SELECT 
+            f.output_token,
             f.input_amount,
-            f.lp_fee,
-            f.tx_hash,
-            f.tx_timestamp,
-            bundle_info.prev_end_block + 1 as start_block,
-            bundle_info.end_block as end_block
-        FROM Fill f, bundle_info
+            COALESCE(f.lp_fee, '0') as lp_fee,  -- lp_fee might be NULL
+            f.tx_hash
+        FROM Fill f
         WHERE f.repayment_chain_id = ?
-        AND f.output_token = ?
         AND f.is_success = 1
-        AND f.block_number <= bundle_info.end_block
-        AND f.block_number > bundle_info.prev_end_block
+        AND f.block_number BETWEEN ? AND ?
         ORDER BY f.block_number ASC
     """,
-        (bundle_id, chain_id, chain_id, token_address),
+        (chain_id, start_block, end_block),
     )
 
-    rows = cursor.fetchall()
-    if not rows:
-        return [], 0, 0
-
-    # All rows have same start/end block
-    fills = [
-        {
-            "input_amount": row[0],
-            "lp_fee": row[1],
-            "tx_hash": row[2],
-            "tx_timestamp": row[3],
-        }
-        for row in rows
-    ]
-
-    start_block = rows[0][4]
-    end_block = rows[0][5]
+    fills_by_token: Dict[str, Dict] = {}
+    for output_token, input_amount, lp_fee, tx_hash in cursor.fetchall():
+        fills = fills_by_token.setdefault(
+            output_token, {"input_amounts": [], "lp_fees": [], "tx_hashes": []}
+        )
+        fills["input_amounts"].append(input_amount)
+        fills["lp_fees"].append(lp_fee)
+        fills["tx_hashes"].append(tx_hash)
 
-    logger.debug(f"Found {len(fills)} fills for bundle {bundle_id}")
-    return fills, start_block, end_block
+    logger.debug(f"Found fills of {len(fills_by_token)} tokens")
+    return fills_by_token
 
 
 def get_bundle_returns(
-    cursor: sqlite3.Cursor, bundle_id: int, chain_id: int, token_address: str
-) -> List[Dict]:
+    cursor: sqlite3.Cursor, bundle_id: int, chain_id: int
+) -> Dict[str, Dict]:
     """
-    Get all returns for a specific bundle and token.
+    Get the returns for a specific bundle, aggregated per token.
 
     Args:
         cursor: Database cursor
         bundle_id: Bundle ID to get returns for
         chain_id: Chain ID
-        token_address: Token address
 
     Returns:
-        List of return records with return_amount, tx_hash
+        Dict of return_token to its returns, with the return_amounts list and
+        the tx_hash of the first return in block order
     """
     cursor.execute(
         """
-        SELECT 
-            r.return_amount,
-            r.tx_hash
+        SELECT r.return_token, r.return_amount, r.tx_hash
         FROM Return r
         WHERE r.return_chain_id = ?
-        AND r.return_token = ?
         AND r.root_bundle_id = ?
         ORDER BY r.block_number ASC
     """,
-        (chain_id, token_address, bundle_id),
+        (chain_id, bundle_id),
     )
 
-    returns = [dict(row) for row in cursor.fetchall()]
-    logger.debug(f"Found {len(returns)} returns for bundle {bundle_id}")
-    return returns
+    returns_by_token: Dict[str, Dict] = {}
+    for return_token, return_amount, tx_hash in cursor.fetchall():
+        returns = returns_by_token.setdefault(
+            return_token, {"return_amounts": [], "tx_hash": tx_hash}
+        )
+        returns["return_amounts"].append(return_amount)
+    logger.debug(
+        f"Found returns of {len(returns_by_token)} tokens for bundle {bundle_id}"
+    )
+    return returns_by_token
 
 
 def find_unprocessed_bundles(cursor: sqlite3.Cursor) -> List[Dict]:
@@ -202,84 +243,102 @@ def find_unprocessed_bundles(cursor: sqlite3.Cursor) -> List[Dict]:
     return bundles
 
 
+def get_active_bundle_fills(
+    cursor: sqlite3.Cursor,
+    chain_id: int,
+    block_range: Tuple[int, int],
+    active_tokens: FrozenSet[Tuple[str, str]],
+) -> Dict[str, Dict]:
+    """
+    Get the fills of a bundle for the chain's active tokens only.
+
+    Args:
+        cursor: Database cursor
+        chain_id: Chain ID (repayment chain)
+        block_range: (start_block, end_block) of the bundle, inclusive
+        active_tokens: Set of (token_address, token_symbol) tuples for this chain
+
+    Returns:
+        Dict of active output_token to its fills, as from get_bundle_fills;
+        empty if the bundle has no fills of active tokens
+    """
+    active_addresses = {token_address for token_address, _ in active_tokens}
+    return {
+        token_address: fills
+        for token_address, fills in get_bundle_fills(
+            cursor, chain_id, *block_range
+        ).items()
+        if token_address in active_addresses
+    }
+
+
 def process_bundle(
-    cursor: sqlite3.Cursor, bundle: Dict, active_tokens: Set[Tuple[str, str]]
+    cursor: sqlite3.Cursor,
+    bundle: Dict,
+    fills_by_token: Dict[str, Dict],
+    active_tokens: FrozenSet[Tuple[str, str]],
+    block_range: Tuple[int, int],
+    block_timestamps: Dict[int, int],
 ) -> None:
     """
     Process a single bundle:
-    1. For each active token:
-        - Get all fills in this bundle for this token
+    1. Get the returns of all tokens in this bundle with one query
+    2. For each active token with fills:
         - Calculate total input amount and LP fees
-        - Insert record into BundleReturn
+    3. Insert the records of all tokens into BundleReturn at once
 
     Args:
         cursor: Database cursor
         bundle: Bundle info dict with bundle_id, chain_id, etc
+        fills_by_token: Fills of the bundle's active tokens, from
+            get_active_bundle_fills()
         active_tokens: Set of (token_address, token_symbol) tuples for this chain
+        block_range: (start_block, end_block) of the bundle, inclusive
+        block_timestamps: Timestamps of the bundle's start and end blocks
     """
     # logger.info(f"Processing bundle {bundle['bundle_id']} on chain {bundle['chain_id']}")
 
-    for token_address, token_symbol in active_tokens:
-        # Get all fills for this bundle and token
-        fills, start_block, end_block = get_bundle_fills(
-            cursor, bundle["bundle_id"], bundle["chain_id"], token_address
-        )
+    start_block, end_block = block_range
+    symbol_by_token = dict(active_tokens)
+
+    # Get the returns of all tokens for this bundle
+    returns_by_token = get_bundle_returns(
+        cursor, bundle["bundle_id"], bundle["chain_id"]
+    )
 
-        if not fills:
-            continue
+    # Get timestamps from blocks
+    start_time = block_timestamps[start_block]
+    end_time = block_timestamps[end_block]
 
-        # Get returns for this bundle and token
-        returns = get_bundle_returns(
-            cursor, bundle["bundle_id"], bundle["chain_id"], token_address
-        )
+    # Get propose and settlement timestamps from Bundle table
+    cursor.execute(
+        """
+        SELECT propose_timestamp, settlement_timestamp 
+        FROM Bundle 
+        WHERE bundle_id = ? AND chain_id = ?
+        """,
+        (bundle["bundle_id"], bundle["chain_id"]),
+    )
+    propose_timestamp, settlement_timestamp = cursor.fetchone()
+    propose_settlement_time_diff = settlement_timestamp - propose_timestamp if propose_timestamp and settlement_timestamp else None
 
-        # Calculate totals
-        total_input = sum(Decimal(f["input_amount"]) for f in fills)
-        total_lp_fee = sum(
-            Decimal(f["lp_fee"] or 0) for f in fills
-        )  # lp_fee might be NULL
-        total_return = sum(Decimal(r["return_amount"]) for r in returns)
-
-        # Get timestamps from blocks
-        start_time = get_block_timestamp(bundle["chain_id"], start_block)
-        end_time = get_block_timestamp(bundle["chain_id"], end_block)
-
-        # Get propose and settlement timestamps from Bundle table
-        cursor.execute(
-            """
-            SELECT propose_timestamp, settlement_timestamp 
-            FROM Bundle 
-            WHERE bundle_id = ? AND chain_id = ?
-            """,
-            (bundle["bundle_id"], bundle["chain_id"]),
-        )
-        propose_timestamp, settlement_timestamp = cursor.fetchone()
-        propose_settlement_time_diff = settlement_timestamp - propose_timestamp if propose_timestamp and settlement_timestamp else None
+    # BundleReturn rows of this bundle, inserted with one executemany
+    rows = []
+    for token_address, fills in fills_by_token.items():
+        token_symbol = symbol_by_token[token_address]
+        returns = returns_by_token.get(token_address)
+
+        # Calculate totals. Amounts are integer wei strings, which Python
+        # ints sum exactly at any size without Decimal's per-value overhead
+        total_input = sum(map(int, fills["input_amounts"]))
+        total_lp_fee = sum(map(int, fills["lp_fees"]))
+        total_return = sum(map(int, returns["return_amounts"])) if returns else 0
 
         # Insert into BundleReturn
-        fill_tx_hashes = ",".join(f["tx_hash"] for f in fills)
-        return_tx_hash = returns[0]["tx_hash"] if returns else None
-
-        cursor.execute(
-            """
-            INSERT INTO BundleReturn (
-                bundle_id,
-                chain_id,
-                token_address,
-                token_symbol,
-                input_amount,
-                return_amount,
-                lp_fee,
-                start_block,
-                end_block,
-                start_time,
-                end_time,
-                fill_tx_hashes,
-                return_tx_hash,
-                relayer_refund_root,
-                propose_settlement_time_diff
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        fill_tx_hashes = ",".join(fills["tx_hashes"])
+        return_tx_hash = returns["tx_hash"] if returns else None
+
+        rows.append(
             (
                 bundle["bundle_id"],
                 bundle["chain_id"],
@@ -296,7 +355,7 @@ def process_bundle(
                 return_tx_hash,
                 bundle["relayer_refund_root"],
                 propose_settlement_time_diff,
-            ),
+            )
         )
 
         # logger.info(
@@ -304,6 +363,70 @@ def process_bundle(
         # f"input={total_input}, return={total_return}, lp_fee={total_lp_fee}"
         # )
 
+    # Insert the records of all tokens of this bundle in one statement
+    cursor.executemany(INSERT_BUNDLE_RETURN_SQL, rows)
+
+
+def process_chain_repayments(
+    conn: sqlite3.Connection,
+    chain_id: int,
+    bundles: List[Dict],
+    active_tokens: FrozenSet[Tuple[str, str]],
+    block_ranges: Dict[Tuple[int, int], Tuple[int, int]],
+) -> None:
+    """
+    Process the unprocessed bundles of one chain and commit their records.
+
+    Args:
+        conn: Database connection
+        chain_id: Chain ID of the bundles
+        bundles: Unprocessed bundles of the chain
+        active_tokens: Set of (token_address, token_symbol) tuples for this chain
+        block_ranges: Block range of every bundle, from get_bundle_block_ranges()
+    """
+    cursor = conn.cursor()
+
+    # Find the bundles with fills of active tokens. The others never
+    # get a BundleReturn record, so they stay unprocessed and are
+    # seen again on every run; they must not cost any RPC calls
+    bundles_with_fills = []
+    for bundle in bundles:
+        block_range = block_ranges[(bundle["bundle_id"], bundle["chain_id"])]
+        fills_by_token = get_active_bundle_fills(
+            cursor, chain_id, block_range, active_tokens
+        )
+        if fills_by_token:
+            bundles_with_fills.append((bundle, block_range, fills_by_token))
+
+    if not bundles_with_fills:
+        logger.info(f"No bundles with fills to process for chain {chain_id}")
+        return
+
+    # Fetch the timestamps of those bundles' start and end blocks
+    # with batched RPC requests
+    block_timestamps = get_block_timestamps(
+        chain_id,
+        {
+            block
+            for _, block_range, _ in bundles_with_fills
+            for block in block_range
+        },
+    )
+
+    # Process each bundle
+    for bundle, block_range, fills_by_token in bundles_with_fills:
+        process_bundle(
+            cursor,
+            bundle,
+            fills_by_token,
+            active_tokens,
+            block_range,
+            block_timestamps,
+        )
+
+    # Commit the records of all bundles of this chain in one transaction
+    conn.commit()
+
 
 def process_repayments() -> None:
     """
@@ -315,7 +438,7 @@ def process_repayments() -> None:
     3. For each chain:
         - Gets active tokens
         - Processes each bundle
-        - Updates BundleReturn table
+        - Commits the chain's BundleReturn records in one transaction
     """
 
     logger.info("=" * 80)
@@ -332,29 +455,44 @@ def process_repayments() -> None:
             logger.info("No unprocessed bundles found")
             return
 
+        # Get the block range of every bundle in one pass over Bundle
+        block_ranges = get_bundle_block_ranges(cursor)
+
         # Group bundles by chain
         bundles_by_chain = defaultdict(list)
         for bundle in unprocessed_bundles:
             bundles_by_chain[bundle["chain_id"]].append(bundle)
 
+        # Look up the active tokens of every chain once, before any bundle
+        active_tokens_by_chain: Dict[int, FrozenSet[Tuple[str, str]]] = {
+            chain_id: find_active_tokens(cursor, chain_id)
+            for chain_id in bundles_by_chain
+        }
+
         # Process each chain
         for chain_id, bundles in bundles_by_chain.items():
             logger.info(f"Processing {len(bundles)} bundles for chain {chain_id}")
 
-            # Get active tokens for this chain
-            active_tokens = find_active_tokens(cursor, chain_id)
+            active_tokens = active_tokens_by_chain[chain_id]
 
             if not active_tokens:
                 logger.warning(f"No active tokens found for chain {chain_id}")
                 continue
 
-            # Process each bundle
-            for bundle in bundles:
-                process_bundle(cursor, bundle, active_tokens)
-                conn.commit()
+            try:
+                process_chain_repayments(
+                    conn, chain_id, bundles, active_tokens, block_ranges
+                )
+            except Exception as e:
+                # Keep the chains that are already committed and go on with
+                # the next one; this chain's bundles are retried next run
+                logger.error(f"Error processing bundles for chain {chain_id}: {e}")
+                conn.rollback()
+                continue
 
             logger.info(f"Finished processing chain {chain_id}")
 
+
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         raise
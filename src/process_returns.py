@@ -2,54 +2,64 @@
 Process return events from spoke pool contracts across all chains.
 """
 
+import json
 import logging
+import sqlite3
 from typing import cast
-from web3.exceptions import ContractLogicError
-from requests.exceptions import RequestException
-import json
 
+from requests.exceptions import RequestException
 from web3.contract import Contract
+from web3.exceptions import ContractLogicError
 
-from src.config import CHAINS, RELAYER_ADDRESS
-from src.db_utils import get_db_connection
-from src.web3_utils import get_block_timestamp, get_spokepool_contracts
+from src.config import CHAINS, CHAINS_BY_ID, RELAYER_ADDRESS
+from src.db_utils import get_db_connection, optimize_and_close
+from src.web3_utils import (
+    fetch_in_block_windows,
+    get_block_timestamps,
+    get_spoke_event_topic,
+    get_spokepool_contracts,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# topic0 of the spoke pool ExecutedRelayerRefundRoot event
+EXECUTED_RELAYER_REFUND_ROOT_TOPIC = get_spoke_event_topic("ExecutedRelayerRefundRoot")
 
-def get_start_block(chain_id: int) -> int:
+
+def get_start_block(chain_id: int, conn: sqlite3.Connection) -> int:
     """Get the block to start processing returns from."""
-    conn = get_db_connection()
     cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT MAX(block_number) 
+        FROM Return 
+        WHERE return_chain_id = ?
+    """,
+        (chain_id,),
+    )
 
-    try:
-        cursor.execute(
-            """
-            SELECT MAX(block_number) 
-            FROM Return 
-            WHERE return_chain_id = ?
-        """,
-            (chain_id,),
-        )
+    result = cursor.fetchone()
+    last_block = result[0] if result else None
 
-        result = cursor.fetchone()
-        last_block = result[0] if result else None
+    if last_block is not None:
+        return last_block + 1
 
-        if last_block is not None:
-            return last_block + 1
-
-        # If no returns processed yet, use chain's configured start block
-        chain = next(c for c in CHAINS if c["chain_id"] == chain_id)
-        return cast(int, chain["start_block"])
-
-    finally:
-        conn.close()
+    # If no returns processed yet, use chain's configured start block
+    chain = CHAINS_BY_ID[chain_id]
+    return cast(int, chain["start_block"])
 
 
 def get_executed_relayer_refund_root_events(contract: Contract, start_block: int, chain_id: int) -> list:
     """
     Fetch ExecutedRelayerRefundRoot events using pagination to handle large block ranges.
+
+    The block range is split into windows that are fetched a few at a time in
+    parallel (see fetch_in_block_windows). refundAddresses isn't indexed, so
+    the node can't filter on it; instead the raw logs are checked for our
+    relayer address as an ABI word in their data, and only those logs are
+    run through the ABI decoder. The caller still checks refundAddresses,
+    since the address may also match another field such as caller.
     
     Args:
         contract (Contract): Web3 contract instance
@@ -57,35 +67,44 @@ def get_executed_relayer_refund_root_events(contract: Contract, start_block: int
         chain_id (int): Chain ID for logging purposes
         
     Returns:
-        list: List of ExecutedRelayerRefundRoot events
+        list: List of decoded ExecutedRelayerRefundRoot events in block order
+            whose data contains the relayer address; empty if RELAYER_ADDRESS
+            is not set
         
     Raises:
         ContractLogicError: If there's an error fetching events from the contract
         RequestException: If there's a network request error
     """
+    if not RELAYER_ADDRESS:
+        logger.error(f"RELAYER_ADDRESS is not set, skipping returns for chain {chain_id}")
+        return []
+
     current_block = contract.w3.eth.block_number
-    all_events = []
-    current_start = start_block
-    
-    # Chunk size for block range pagination
-    # https://docs.chainstack.com/docs/understanding-eth-getlogs-limitations
-    BLOCK_CHUNK_SIZE = 5000
-    
-    while current_start < current_block:
-        current_end = min(current_start + BLOCK_CHUNK_SIZE - 1, current_block)
-        logger.info(f"Fetching blocks {current_start} to {current_end} for chain {chain_id}")
-        
-        chunk_events = contract.events.ExecutedRelayerRefundRoot.get_logs(
-            from_block=current_start,
-            to_block=current_end
+    logger.info(f"Fetching blocks {start_block} to {current_block} for chain {chain_id}")
+
+    event = contract.events.ExecutedRelayerRefundRoot()
+    # Addresses are ABI-encoded as 32-byte words, left-padded with zeros
+    relayer_word = bytes.fromhex(RELAYER_ADDRESS[2:]).rjust(32, b"\0")
+
+    def fetch_window(window_start: int, window_end: int) -> list:
+        logs = contract.w3.eth.get_logs(
+            {
+                "address": contract.address,
+                "fromBlock": window_start,
+                "toBlock": window_end,
+                "topics": [EXECUTED_RELAYER_REFUND_ROOT_TOPIC],
+            }
         )
-        all_events.extend(chunk_events)
-        current_start = current_end + 1
-        
-    return all_events
+        return [
+            event.process_log(log) for log in logs if relayer_word in bytes(log["data"])
+        ]
 
+    return fetch_in_block_windows(fetch_window, start_block, current_block)
 
-def process_chain_returns(chain_id: int, contract: Contract, start_block: int) -> int:
+
+def process_chain_returns(
+    chain_id: int, contract: Contract, start_block: int, conn: sqlite3.Connection
+) -> int:
     """
     Process return events for a specific blockchain chain.
 
@@ -93,6 +112,7 @@ def process_chain_returns(chain_id: int, contract: Contract, start_block: int) -
         chain_id (int): ID of the blockchain chain to process returns for
         contract (Contract): Web3 contract instance for the chain
         start_block (int): Block number to start processing returns from
+        conn (sqlite3.Connection): Database connection of this chain
 
     Returns:
         int: Number of return events processed and saved
@@ -127,75 +147,93 @@ def process_chain_returns(chain_id: int, contract: Contract, start_block: int) -
             1 for event in events if RELAYER_ADDRESS in event["args"]["refundAddresses"]
         )
         logger.info(
-            f"Found {len(events)} return events for chain {chain_id} ({matching_events} matching our relayer address)"
+            f"Found {len(events)} return events mentioning our relayer address for chain {chain_id} ({matching_events} refunding it)"
+        )
+
+        # Fetch the timestamps of the matching events' blocks in batches
+        block_timestamps = get_block_timestamps(
+            chain_id,
+            {
+                event["blockNumber"]
+                for event in events
+                if RELAYER_ADDRESS in event["args"]["refundAddresses"]
+            },
         )
 
-        # Process events
-        conn = get_db_connection()
+        # Collect the Return rows of all matching events
+        rows = []
+        for event in events:
+            refund_addresses = event["args"]["refundAddresses"]
+            if RELAYER_ADDRESS in refund_addresses:
+                timestamp = block_timestamps[event["blockNumber"]]
+                indices = [
+                    i
+                    for i, addr in enumerate(refund_addresses)
+                    if addr == RELAYER_ADDRESS
+                ]
+                for index in indices:
+                    rows.append(
+                        (
+                            event["transactionHash"].hex(),  #! tx_hash
+                            chain_id,  #! return_chain_id
+                            event["args"]["l2TokenAddress"],  #! return_token
+                            str(
+                                event["args"]["refundAmounts"][index]
+                            ),  #! return_amount
+                            event["args"]["rootBundleId"],  #! root_bundle_id
+                            event["args"]["leafId"],  #! leaf_id
+                            event["args"]["refundAddresses"][
+                                index
+                            ],  #! refund_address
+                            1
+                            if event["args"]["deferredRefunds"]
+                            else 0,  #! is_deferred
+                            event["args"]["caller"],  #! caller
+                            event["blockNumber"],  #! block_number
+                            timestamp,  #! tx_timestamp
+                        )
+                    )
+
+        # Insert all rows in one statement and one transaction; returns
+        # already stored under the same key are skipped, any other
+        # constraint failure still aborts the batch
         cursor = conn.cursor()
-        returns_saved = 0
 
         try:
-            for event in events:
-                refund_addresses = event["args"]["refundAddresses"]
-                if RELAYER_ADDRESS in refund_addresses:
-                    timestamp = get_block_timestamp(chain_id, event["blockNumber"])
-                    indices = [
-                        i
-                        for i, addr in enumerate(refund_addresses)
-                        if addr == RELAYER_ADDRESS
-                    ]
-                    for index in indices:
-                        try:
-                            cursor.execute(
-                                """
-                                INSERT INTO Return (
-                                    tx_hash,
-                                    return_chain_id,
-                                    return_token,
-                                    return_amount,
-                                    root_bundle_id,
-                                    leaf_id,
-                                    refund_address,
-                                    is_deferred,
-                                    caller,
-                                    block_number,
-                                    tx_timestamp
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)  
-                            """,
-                                (
-                                    event["transactionHash"].hex(),  #! tx_hash
-                                    chain_id,  #! return_chain_id
-                                    event["args"]["l2TokenAddress"],  #! return_token
-                                    str(
-                                        event["args"]["refundAmounts"][index]
-                                    ),  #! return_amount
-                                    event["args"]["rootBundleId"],  #! root_bundle_id
-                                    event["args"]["leafId"],  #! leaf_id
-                                    event["args"]["refundAddresses"][
-                                        index
-                                    ],  #! refund_address
-                                    1
-                                    if event["args"]["deferredRefunds"]
-                                    else 0,  #! is_deferred
-                                    event["args"]["caller"],  #! caller
-                                    event["blockNumber"],  #! block_number
-                                    timestamp,  #! tx_timestamp
-                                ),
-                            )
-                            returns_saved += 1
-                        except Exception as e:
-                            logger.error(
-                                f"Error inserting return event for chain {chain_id}: {e}"
-                            )
+            cursor.executemany(
+                """
+                INSERT INTO Return (
+                    tx_hash,
+                    return_chain_id,
+                    return_token,
+                    return_amount,
+                    root_bundle_id,
+                    leaf_id,
+                    refund_address,
+                    is_deferred,
+                    caller,
+                    block_number,
+                    tx_timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (tx_hash, return_token, refund_address) DO NOTHING
+            """,
+                rows,
+            )
             conn.commit()
+            returns_saved = cursor.rowcount
+
+            if returns_saved < len(rows):
+                logger.warning(
+                    f"Skipped {len(rows) - returns_saved} return events already stored for chain {chain_id}"
+                )
             logger.info(
                 f"Processed returns up to block {events[-1]['blockNumber']} for chain {chain_id}"
             )
             return returns_saved
 
-        finally:
-            conn.close()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
 
     except Exception as e:
         logger.error(f"Error processing returns for chain {chain_id}: {e}")
@@ -214,18 +252,24 @@ def process_returns():
         logger.error("No contracts initialized. Cannot process returns.")
         return
 
-    # Process each chain
+    # Process each chain on one connection for the start block lookups and
+    # the inserts
+    conn = get_db_connection()
     total_returns = 0
-    for chain in CHAINS:
-        try:
+    try:
+        for chain in CHAINS:
             chain_id = cast(int, chain["chain_id"])
-            if chain_id == 1: # we only have returns for WBTC on eth_mainnet
-                start_block = get_start_block(chain_id)
+            if chain_id != 1:  # we only have returns for WBTC on eth_mainnet
+                continue
+            try:
+                start_block = get_start_block(chain_id, conn)
                 total_returns += process_chain_returns(
-                    chain_id, contracts[chain_id], start_block
+                    chain_id, contracts[chain_id], start_block, conn
                 )
-        except Exception as e:
-            logger.error(f"Failed to process chain {chain_id}: {e}")
+            except Exception as e:
+                logger.error(f"Failed to process chain {chain_id}: {e}")
+    finally:
+        optimize_and_close(conn)
 
     logger.info(f"Total returns saved: {total_returns}")
 
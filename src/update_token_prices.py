@@ -13,13 +13,17 @@ from typing import Optional
 
 import requests
 
-from src.config import CHAINS, COINGECKO_KEY, COINGECKO_SYMBOL_MAP
+from src.config import CHAINS_BY_ID, COINGECKO_KEY, COINGECKO_SYMBOL_MAP
 from src.db_utils import get_db_connection
 from src.web3_utils import get_block_timestamp
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Shared session so the per-date price requests reuse one keep-alive
+# connection to CoinGecko instead of a new TCP/TLS handshake each
+_session = requests.Session()
+
 
 def _get_price_from_api(coingecko_id: str, date_str: str) -> Optional[Decimal]:
     """Get historical price from CoinGecko API with retries."""
@@ -33,7 +37,7 @@ def _get_price_from_api(coingecko_id: str, date_str: str) -> Optional[Decimal]:
 
     for attempt in range(retries):
         try:
-            response = requests.get(url, params=params)
+            response = _session.get(url, params=params, timeout=30)
 
             # Handle rate limiting with exponential backoff
             if response.status_code == 429:
@@ -70,9 +74,7 @@ def update_token_prices():
 
     try:
         # Get start timestamp from Ethereum's start block
-        eth_start_block = next(
-            chain["start_block"] for chain in CHAINS if chain["chain_id"] == 1
-        )
+        eth_start_block = CHAINS_BY_ID[1]["start_block"]
         start_timestamp = get_block_timestamp(1, eth_start_block)
         start_date = datetime.fromtimestamp(start_timestamp, tz=timezone.utc).date()
         end_date = datetime.now(timezone.utc).date()
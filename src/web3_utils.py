@@ -6,21 +6,117 @@ import json
 import logging
 import os
 import time
-from typing import Any, Dict, Optional, cast
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, cast
 
+from eth_typing import ABIEvent
+from eth_utils import event_abi_to_log_topic, to_checksum_address
 from web3 import Web3
 from web3.contract import Contract
 
-from src.config import CHAINS, HUB_ADDRESS, get_chains
+from src.config import CHAINS, CHAINS_BY_ID, HUB_ADDRESS, get_chains
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# ABI of the spoke pool contracts on every chain
+SPOKE_ABI_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "abi", "spoke_abi.json"
+)
 
+# Chunk size for block range pagination
+# https://docs.chainstack.com/docs/understanding-eth-getlogs-limitations
+BLOCK_CHUNK_SIZE = 5000
+
+# Number of windows fetched at the same time
+MAX_PARALLEL_WINDOWS = 4
+
+
+@lru_cache(maxsize=4096)
+def bytes32_to_checksum_address(value: bytes) -> str:
+    """
+    Convert a left-padded bytes32 address (as used in relayData) to a checksum address.
+
+    Works on the raw bytes instead of hex-encoding and slicing the string.
+    Results are cached since the same tokens and relayers repeat across fills.
+
+    Args:
+        value (bytes): 32-byte value with the address in the last 20 bytes
+
+    Returns:
+        str: Checksummed address
+    """
+    return to_checksum_address(value[-20:])
+
+
+@lru_cache(maxsize=None)
+def get_web3(rpc_url: str) -> Web3:
+    """
+    Get a Web3 instance for an RPC endpoint, reusing it across calls.
+
+    Reusing the instance keeps the provider's HTTP session, and with it the
+    keep-alive connections to the RPC endpoint, for the whole process.
+
+    Args:
+        rpc_url (str): RPC endpoint URL
+
+    Returns:
+        Web3: Web3 instance connected to the endpoint
+    """
+    return Web3(Web3.HTTPProvider(rpc_url))
+
+
+@lru_cache(maxsize=None)
+def _load_abi(abi_path: str) -> List[Dict[str, Any]]:
+    """
+    Load and parse an ABI JSON file once per process.
+
+    web3 doesn't modify the ABI it is given, so the parsed list is shared by
+    every contract built from it.
+
+    Args:
+        abi_path (str): Path to the ABI JSON file
+
+    Returns:
+        list: Parsed ABI
+
+    Raises:
+        FileNotFoundError: If the ABI file doesn't exist
+    """
+    with open(abi_path, "r") as file:
+        return json.load(file)
+
+
+def get_spoke_event_topic(event_name: str) -> str:
+    """
+    Get topic0 of a spoke pool event from the spoke pool ABI.
+
+    Raw eth_getLogs filters use this instead of a hand-written event
+    signature, so they always match the ABI the contracts decode with.
+
+    Args:
+        event_name (str): Name of the event, e.g. "FundsDeposited"
+
+    Returns:
+        str: The event topic as a 0x-prefixed hex string
+
+    Raises:
+        ValueError: If the ABI has no event with this name
+    """
+    for item in _load_abi(SPOKE_ABI_PATH):
+        if item.get("type") == "event" and item.get("name") == event_name:
+            return "0x" + event_abi_to_log_topic(cast(ABIEvent, item)).hex()
+    raise ValueError(f"No event {event_name} in the spoke pool ABI")
+
+
+@lru_cache(maxsize=1)
 def get_hub_contract() -> Optional[Contract]:
     """
     Get Web3 contract instance for the Across Hub contract on Ethereum.
 
+    The contract is built once per process and shared by all callers.
+
     Returns:
         Optional[Contract]: Web3 contract instance for the hub, or None if initialization fails
     """
@@ -29,20 +125,19 @@ def get_hub_contract() -> Optional[Contract]:
         os.path.dirname(os.path.abspath(__file__)), "abi", "hub_abi.json"
     )
     try:
-        with open(hub_abi_path, "r") as file:
-            hub_abi = json.load(file)
+        hub_abi = _load_abi(hub_abi_path)
     except FileNotFoundError:
         logger.error(f"Could not find Hub ABI file at {hub_abi_path}")
         return None
 
-    eth_chain = next((c for c in CHAINS if c["chain_id"] == 1), None)
+    eth_chain = CHAINS_BY_ID.get(1)
     if not eth_chain:
         logger.error("Ethereum chain configuration not found")
         return None
 
     try:
         rpc_url = cast(str, eth_chain["rpc_url"])
-        w3 = Web3(Web3.HTTPProvider(rpc_url))
+        w3 = get_web3(rpc_url)
 
         hub_address = cast(str, HUB_ADDRESS)
         if not hub_address:
@@ -58,10 +153,13 @@ def get_hub_contract() -> Optional[Contract]:
         return None
 
 
+@lru_cache(maxsize=1)
 def get_spokepool_contracts() -> Dict[int, Contract]:
     """
     Get Web3 contract instances for spoke pools on each chain.
 
+    The contracts are built once per process and shared by all callers.
+
     Returns:
         Dict[int, Contract]: Dictionary mapping chain IDs to contract instances
 
@@ -69,14 +167,10 @@ def get_spokepool_contracts() -> Dict[int, Contract]:
         TypeError: If chain configuration has invalid types for required fields
     """
     # Load Spoke Pool ABI
-    spoke_abi_path = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "abi", "spoke_abi.json"
-    )
     try:
-        with open(spoke_abi_path, "r") as file:
-            spoke_pool_abi = json.load(file)
+        spoke_pool_abi = _load_abi(SPOKE_ABI_PATH)
     except FileNotFoundError:
-        logger.error(f"Could not find Spoke Pool ABI file at {spoke_abi_path}")
+        logger.error(f"Could not find Spoke Pool ABI file at {SPOKE_ABI_PATH}")
         return {}
 
     contracts: Dict[int, Contract] = {}
@@ -103,7 +197,7 @@ def get_spokepool_contracts() -> Dict[int, Contract]:
                 logger.error(f"Invalid type in chain configuration: {str(e)}")
                 continue
 
-            w3 = Web3(Web3.HTTPProvider(rpc_url_str))
+            w3 = get_web3(rpc_url_str)
             checksum_address = Web3.to_checksum_address(spoke_pool_address_str)
             contract = w3.eth.contract(address=checksum_address, abi=spoke_pool_abi)
             contracts[chain_id_int] = contract
@@ -133,8 +227,7 @@ def get_erc20_token_info(token_address: str, chain_id: int) -> Dict[str, Any]:
         os.path.dirname(os.path.abspath(__file__)), "abi", "erc20_abi.json"
     )
     try:
-        with open(erc20_abi_path, "r") as file:
-            erc20_abi = json.load(file)
+        erc20_abi = _load_abi(erc20_abi_path)
     except FileNotFoundError:
         logger.error(f"Could not find ERC20 ABI file at {erc20_abi_path}")
         return {
@@ -158,7 +251,7 @@ def get_erc20_token_info(token_address: str, chain_id: int) -> Dict[str, Any]:
                     "decimals": None,
                 }
 
-            w3 = Web3(Web3.HTTPProvider(rpc_url_str))
+            w3 = get_web3(rpc_url_str)
             checksum_address = Web3.to_checksum_address(token_address)
             token_contract = w3.eth.contract(address=checksum_address, abi=erc20_abi)
 
@@ -176,6 +269,39 @@ def get_erc20_token_info(token_address: str, chain_id: int) -> Dict[str, Any]:
     return {"address": token_address, "name": None, "symbol": None, "decimals": None}
 
 
+def fetch_in_block_windows(
+    fetch_window: Callable[[int, int], List], from_block: int, to_block: int
+) -> List:
+    """
+    Fetch logs over a block range in fixed-size windows.
+
+    Providers limit the block range of a single eth_getLogs call, so the range
+    is split into windows that are fetched a few at a time in parallel and
+    returned in block order.
+
+    Args:
+        fetch_window: Called with (from_block, to_block) of one window, both
+            inclusive, and returns the logs of that window
+        from_block: First block to search (inclusive)
+        to_block: Last block to search (inclusive)
+
+    Returns:
+        List of logs in block order
+    """
+    windows = [
+        (window_start, min(window_start + BLOCK_CHUNK_SIZE - 1, to_block))
+        for window_start in range(from_block, to_block + 1, BLOCK_CHUNK_SIZE)
+    ]
+
+    logs: List = []
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_WINDOWS) as executor:
+        for window_logs in executor.map(
+            lambda window: fetch_window(*window), windows
+        ):
+            logs.extend(window_logs)
+    return logs
+
+
 def get_block_timestamp(chain_id: int, block_number: int) -> int:
     """
     Get block timestamp for a given block number on a specific chain.
@@ -208,7 +334,7 @@ def get_block_timestamp(chain_id: int, block_number: int) -> int:
                 logger.error(f"Invalid RPC URL type for chain {chain_id}: {str(e)}")
                 raise ValueError(f"Invalid RPC URL configuration for chain {chain_id}")
 
-            w3 = Web3(Web3.HTTPProvider(rpc_url_str))
+            w3 = get_web3(rpc_url_str)
             block = w3.eth.get_block(block_number)
             return block["timestamp"]
 
@@ -231,3 +357,74 @@ def get_block_timestamp(chain_id: int, block_number: int) -> int:
         f"Failed to get block timestamp after {max_retries} attempts for block {block_number} on chain {chain_id}: {str(last_error)}"
     )
     raise last_error
+
+
+# Number of eth_getBlockByNumber calls sent in one JSON-RPC batch
+BLOCK_TIMESTAMP_BATCH_SIZE = 100
+
+
+def get_block_timestamps(chain_id: int, block_numbers: Iterable[int]) -> Dict[int, int]:
+    """
+    Get the timestamps of many blocks on a chain with batched RPC requests.
+
+    The blocks are fetched with JSON-RPC batches of up to
+    BLOCK_TIMESTAMP_BATCH_SIZE eth_getBlockByNumber calls each, so looking up
+    K blocks costs about K / BLOCK_TIMESTAMP_BATCH_SIZE round trips instead
+    of K. A batch is retried up to 3 times if there's a connection error.
+
+    Args:
+        chain_id (int): ID of the blockchain chain
+        block_numbers (Iterable[int]): Block numbers to get timestamps for
+
+    Returns:
+        Dict[int, int]: Block number to block timestamp
+
+    Raises:
+        ValueError: If chain configuration is missing or invalid, or a block
+            request in a batch returns an error
+        Exception: If all retries of a batch fail
+    """
+    chain = get_chains(chain_id)
+    if not chain or not chain.get("rpc_url"):
+        raise ValueError(f"Missing or invalid configuration for chain {chain_id}")
+    w3 = get_web3(cast(str, chain["rpc_url"]))
+
+    blocks = sorted(set(block_numbers))
+    timestamps: Dict[int, int] = {}
+    max_retries = 3
+
+    for i in range(0, len(blocks), BLOCK_TIMESTAMP_BATCH_SIZE):
+        batch_blocks = blocks[i : i + BLOCK_TIMESTAMP_BATCH_SIZE]
+        retries = 0
+        while True:
+            try:
+                with w3.batch_requests() as batch:
+                    for block_number in batch_blocks:
+                        batch.add(w3.eth.get_block(block_number))
+                    results = batch.execute()
+                break
+            except (ConnectionError, TimeoutError) as e:
+                retries += 1
+                if retries >= max_retries:
+                    logger.error(
+                        f"Failed to get block timestamps after {max_retries} attempts "
+                        f"for {len(batch_blocks)} blocks on chain {chain_id}: {str(e)}"
+                    )
+                    raise
+                logger.warning(f"Attempt {retries} failed, retrying... Error: {str(e)}")
+                time.sleep(1)  # Simple 1 second delay between retries
+
+        for block_number, response in zip(batch_blocks, results):
+            if "error" in response:
+                raise ValueError(
+                    f"Error getting block {block_number} on chain {chain_id}: "
+                    f"{response['error']}"
+                )
+            # web3 unwraps batch items into blocks; a raw response nests it
+            block = cast(Dict[str, Any], response.get("result", response))
+            timestamp = block["timestamp"]
+            timestamps[block_number] = (
+                int(timestamp, 16) if isinstance(timestamp, str) else int(timestamp)
+            )
+
+    return timestamps
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Test for enrich_fills.py
+
+Tests the enrichment steps that don't need a live RPC or the Across API:
+1. Decoding depositId and quoteTimestamp from raw FundsDeposited logs
+2. Splitting block ranges the provider rejects as too large
+3. Quoting one LP fee per bucket and scaling it to each fill
+4. Selecting pending fills and recording runs without a deposit event
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+import unittest
+from unittest import mock
+
+# Add the parent directory to sys.path to import enrich_fills
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import enrich_fills  # noqa: E402
+from src.init_db import DDL_STMTS  # noqa: E402
+
+
+def make_deposit_log(deposit_id, quote_timestamp, block_number):
+    """Build a raw FundsDeposited log as returned by eth_getLogs."""
+    words = [
+        b"\x11" * 32,  # inputToken
+        b"\x22" * 32,  # outputToken
+        (10**18).to_bytes(32, "big"),  # inputAmount
+        (10**18 - 1).to_bytes(32, "big"),  # outputAmount
+        quote_timestamp.to_bytes(32, "big"),  # quoteTimestamp
+        (quote_timestamp + 3600).to_bytes(32, "big"),  # fillDeadline
+    ]
+    return {
+        "topics": [
+            bytes.fromhex(enrich_fills.FUNDS_DEPOSITED_TOPIC[2:]),
+            (42161).to_bytes(32, "big"),  # destinationChainId
+            deposit_id.to_bytes(32, "big"),
+            b"\x33" * 32,  # depositor
+        ],
+        "data": b"".join(words),
+        "blockNumber": block_number,
+    }
+
+
+class FakeContract:
+    """Spoke pool contract whose provider rejects ranges above max_span."""
+
+    def __init__(self, logs, max_span=None):
+        self.address = "0x" + "ab" * 20
+        self.logs = logs
+        self.max_span = max_span
+        self.calls = []
+        self.w3 = mock.Mock()
+        self.w3.eth.get_logs.side_effect = self.get_logs
+
+    def get_logs(self, params):
+        from_block, to_block = params["fromBlock"], params["toBlock"]
+        self.calls.append((from_block, to_block))
+        if self.max_span is not None and to_block - from_block + 1 > self.max_span:
+            raise ValueError("query returned more than 10000 results")
+        return [
+            log for log in self.logs if from_block <= log["blockNumber"] <= to_block
+        ]
+
+
+class TestGetDepositLogs(unittest.TestCase):
+    """Test case for get_deposit_logs."""
+
+    def test_decodes_deposit_id_and_quote_timestamp(self):
+        """Test that the fields are read from topics[2] and data[128:160]."""
+        deposit_id = 2**64 + 7  # above 64 bits, as deposit IDs can be
+        contract = FakeContract([make_deposit_log(deposit_id, 1700000000, 123)])
+
+        events = enrich_fills.get_deposit_logs(contract, 100, 200, [deposit_id])
+
+        self.assertEqual(
+            events,
+            [
+                {
+                    "args": {"depositId": deposit_id, "quoteTimestamp": 1700000000},
+                    "blockNumber": 123,
+                }
+            ],
+        )
+
+        # The deposit IDs are passed as one OR-topic filter
+        params = contract.w3.eth.get_logs.call_args[0][0]
+        self.assertEqual(params["topics"][0], enrich_fills.FUNDS_DEPOSITED_TOPIC)
+        self.assertEqual(
+            params["topics"][2], ["0x" + deposit_id.to_bytes(32, "big").hex()]
+        )
+
+
+class TestQueryDepositEvents(unittest.TestCase):
+    """Test case for query_deposit_events."""
+
+    def setUp(self):
+        """Skip the backoff delays."""
+        self.sleep_patcher = mock.patch("src.enrich_fills.time.sleep")
+        self.sleep_patcher.start()
+
+    def tearDown(self):
+        """Restore the backoff delays."""
+        self.sleep_patcher.stop()
+
+    def test_splits_rejected_ranges_and_keeps_all_events(self):
+        """Test that large ranges are split until the provider accepts them."""
+        logs = [
+            make_deposit_log(deposit_id, 1700000000 + deposit_id, block)
+            for deposit_id, block in enumerate(range(0, 100_000, 7_919))
+        ]
+        contract = FakeContract(logs, max_span=25_000)
+
+        events, complete = enrich_fills.query_deposit_events(
+            contract, "Test", 0, 99_999, list(range(len(logs)))
+        )
+
+        self.assertTrue(complete)
+        self.assertEqual(
+            sorted(event["args"]["depositId"] for event in events),
+            list(range(len(logs))),
+        )
+        # Every block is searched exactly once by the accepted calls
+        accepted = sorted(
+            (start, end) for start, end in contract.calls if end - start < 25_000
+        )
+        self.assertEqual(accepted[0][0], 0)
+        self.assertEqual(accepted[-1][1], 99_999)
+        for (_, end), (start, _) in zip(accepted, accepted[1:]):
+            self.assertEqual(start, end + 1)
+
+    def test_stops_splitting_at_minimum_span(self):
+        """Test that a provider rejecting every range doesn't loop forever."""
+        contract = FakeContract([], max_span=0)
+
+        events, complete = enrich_fills.query_deposit_events(
+            contract, "Test", 0, 99_999, [1]
+        )
+
+        self.assertEqual(events, [])
+        self.assertFalse(complete)
+        # No range is split below MIN_RANGE_SPLIT_SPAN blocks
+        for start, end in contract.calls:
+            self.assertGreaterEqual(end - start + 1, enrich_fills.MIN_RANGE_SPLIT_SPAN)
+
+
+class EnrichmentDbTestCase(unittest.TestCase):
+    """Base test case running the enrichment queries on an in-memory database."""
+
+    def setUp(self):
+        """Create the schema in an in-memory shared connection."""
+        self.conn = sqlite3.connect(
+            ":memory:", isolation_level=None, check_same_thread=False
+        )
+        for stmt in DDL_STMTS:
+            self.conn.execute(stmt)
+        self.conn_patcher = mock.patch.object(enrich_fills, "_conn", self.conn)
+        self.conn_patcher.start()
+
+    def tearDown(self):
+        """Close the in-memory database."""
+        self.conn_patcher.stop()
+        self.conn.close()
+
+    def insert_fill(self, tx_hash, **columns):
+        """Insert a successful fill pending enrichment."""
+        row = {
+            "tx_hash": tx_hash,
+            "route_id": 1,
+            "depositor": "0xdepositor",
+            "recipient": "0xrecipient",
+            "exclusive_relayer": "0x0",
+            "input_token": "0xinput",
+            "output_token": "0xoutput",
+            "input_amount": "1000",
+            "output_amount": "990",
+            "origin_chain_id": 1,
+            "destination_chain_id": 42161,
+            "deposit_id": "1",
+            "block_number": 100,
+            "tx_timestamp": 1700000000,
+        }
+        row.update(columns)
+        self.conn.execute(
+            f"INSERT INTO Fill ({', '.join(row)}) "
+            f"VALUES ({', '.join('?' for _ in row)})",
+            list(row.values()),
+        )
+
+
+class TestPendingFills(EnrichmentDbTestCase):
+    """Test case for iter_unenriched_fills and record_missing_deposits."""
+
+    def pending_tx_hashes(self, batch_size=2000):
+        """Return the tx hashes yielded by iter_unenriched_fills."""
+        return [
+            fill["tx_hash"]
+            for fills in enrich_fills.iter_unenriched_fills(batch_size)
+            for fill in fills
+        ]
+
+    def test_filters_pending_fills(self):
+        """Test which fills are selected for enrichment."""
+        now = int(time.time())
+        retry_interval = enrich_fills.ENRICHMENT_RETRY_INTERVAL
+        self.insert_fill("0x01")
+        self.insert_fill("0x02", deposit_timestamp=1700000000)
+        self.insert_fill("0x03", deposit_timestamp=1700000000, lp_fee="1")
+        self.insert_fill("0x04", is_success=0)
+        self.insert_fill("0x05", enrichment_attempts=1, last_enrichment_attempt=now)
+        self.insert_fill(
+            "0x06",
+            enrichment_attempts=1,
+            last_enrichment_attempt=now - retry_interval - 1,
+        )
+        self.insert_fill(
+            "0x07",
+            enrichment_attempts=enrich_fills.MAX_ENRICHMENT_ATTEMPTS,
+            last_enrichment_attempt=now - retry_interval - 1,
+        )
+        # Capped fills are still retried after the longer interval
+        self.insert_fill(
+            "0x08",
+            enrichment_attempts=enrich_fills.MAX_ENRICHMENT_ATTEMPTS,
+            last_enrichment_attempt=now
+            - enrich_fills.CAPPED_ENRICHMENT_RETRY_INTERVAL
+            - 1,
+        )
+
+        pending = ["0x01", "0x02", "0x06", "0x08"]
+        self.assertEqual(self.pending_tx_hashes(), pending)
+        # Pages follow each other without gaps or repeats
+        self.assertEqual(self.pending_tx_hashes(batch_size=3), pending)
+
+    def test_deposit_id_is_int(self):
+        """Test that deposit IDs above 64 bits are returned as ints."""
+        self.insert_fill("0x01", deposit_id=str(2**64 + 1))
+
+        fills = next(enrich_fills.iter_unenriched_fills())
+
+        self.assertEqual(fills[0]["deposit_id"], 2**64 + 1)
+
+    def test_record_missing_deposits(self):
+        """Test that a run without a deposit event backs off on the fill."""
+        self.insert_fill("0x01")
+        self.insert_fill("0x02")
+
+        self.assertEqual(enrich_fills.record_missing_deposits(["0x01"]), 1)
+        self.assertEqual(enrich_fills.record_missing_deposits([]), 0)
+
+        row = self.conn.execute(
+            "SELECT enrichment_attempts, last_enrichment_attempt "
+            "FROM Fill WHERE tx_hash = '0x01'"
+        ).fetchone()
+        self.assertEqual(row[0], 1)
+        self.assertAlmostEqual(row[1], int(time.time()), delta=5)
+
+        # The fill is skipped until the retry interval has passed
+        self.assertEqual(self.pending_tx_hashes(), ["0x02"])
+
+    def test_found_deposit_resets_attempts(self):
+        """Test that enriching a fill clears its runs without a deposit."""
+        self.insert_fill(
+            "0x01",
+            enrichment_attempts=enrich_fills.MAX_ENRICHMENT_ATTEMPTS,
+            last_enrichment_attempt=int(time.time()),
+        )
+
+        updated = enrich_fills.update_fills_with_enrichment(
+            [(1700000000, 1000, None, "0x01")]
+        )
+
+        self.assertEqual(updated, 1)
+        row = self.conn.execute(
+            "SELECT deposit_block_number, enrichment_attempts, "
+            "last_enrichment_attempt FROM Fill WHERE tx_hash = '0x01'"
+        ).fetchone()
+        self.assertEqual(row, (1000, 0, None))
+        # Still pending its LP fee, and no longer backed off
+        self.assertEqual(self.pending_tx_hashes(), ["0x01"])
+
+
+class TestProcessFillBatch(unittest.TestCase):
+    """Test case for process_fill_batch."""
+
+    @staticmethod
+    def make_fill(tx_hash, deposit_id, amount):
+        """Build a fill as yielded by iter_unenriched_fills."""
+        return {
+            "tx_hash": tx_hash,
+            "deposit_id": deposit_id,
+            "origin_chain_id": 1,
+            "destination_chain_id": 42161,
+            "input_token": "0xinput",
+            "output_token": "0xoutput",
+            "input_amount": str(amount),
+            "tx_timestamp": 1700000100,
+            "deposit_block_number": None,
+        }
+
+    @staticmethod
+    def make_event(deposit_id, quote_timestamp):
+        """Build a deposit event as returned by get_deposit_logs."""
+        return {
+            "args": {"depositId": deposit_id, "quoteTimestamp": quote_timestamp},
+            "blockNumber": 1000 + deposit_id,
+        }
+
+    def run_batch(self, fills, deposit_events, searched_deposits):
+        """Run process_fill_batch with a 10% LP fee quote."""
+
+        async def get_lp_fee(*args):
+            return str(int(args[4]) // 10)
+
+        with (
+            mock.patch.object(
+                enrich_fills, "get_lp_fee", side_effect=get_lp_fee
+            ) as lp_fee_mock,
+            mock.patch.object(
+                enrich_fills, "update_fills_with_enrichment"
+            ) as update_mock,
+            mock.patch.object(enrich_fills, "record_missing_deposits") as record_mock,
+        ):
+            result = asyncio.run(
+                enrich_fills.process_fill_batch(
+                    fills,
+                    deposit_events,
+                    searched_deposits,
+                    mock.Mock(),
+                    asyncio.Semaphore(1),
+                )
+            )
+
+        updates = {
+            update[3]: update
+            for call in update_mock.call_args_list
+            for update in call.args[0]
+        }
+        return result, lp_fee_mock, updates, record_mock.call_args.args[0]
+
+    def test_quotes_bucket_median_and_scales_fees(self):
+        """Test that a bucket is quoted once, at its median amount."""
+        fills = [
+            self.make_fill("0x01", 1, 1000),
+            self.make_fill("0x02", 2, 1100),
+            self.make_fill("0x03", 3, 1050),
+            # Deposited a minute later, so quoted on its own
+            self.make_fill("0x04", 4, 1000),
+        ]
+        deposit_events = {
+            (1, 1): self.make_event(1, 1700000000),
+            (1, 2): self.make_event(2, 1700000010),
+            (1, 3): self.make_event(3, 1700000020),
+            (1, 4): self.make_event(4, 1700000060),
+        }
+
+        result, lp_fee_mock, updates, _ = self.run_batch(
+            fills, deposit_events, set(deposit_events)
+        )
+
+        self.assertEqual(result, (4, 0))
+        quoted = sorted(
+            (call.args[4], call.args[5]) for call in lp_fee_mock.call_args_list
+        )
+        self.assertEqual(quoted, [("1000", 1700000060), ("1050", 1700000020)])
+        # 105 for the 1050 median, scaled linearly to the other amounts
+        self.assertEqual(updates["0x01"], (1700000000, 1001, "100", "0x01"))
+        self.assertEqual(updates["0x02"], (1700000010, 1002, "110", "0x02"))
+        self.assertEqual(updates["0x03"], (1700000020, 1003, "105", "0x03"))
+        self.assertEqual(updates["0x04"], (1700000060, 1004, "100", "0x04"))
+
+    def test_zero_amounts_get_their_own_bucket(self):
+        """Test that a zero amount is never the quote for a non-zero one."""
+        fills = [
+            self.make_fill("0x01", 1, 0),
+            self.make_fill("0x02", 2, 0),
+            self.make_fill("0x03", 3, 1),
+        ]
+        deposit_events = {
+            (1, 1): self.make_event(1, 1700000000),
+            (1, 2): self.make_event(2, 1700000000),
+            (1, 3): self.make_event(3, 1700000000),
+        }
+
+        result, lp_fee_mock, updates, _ = self.run_batch(
+            fills, deposit_events, set(deposit_events)
+        )
+
+        self.assertEqual(result, (3, 0))
+        quoted = sorted(call.args[4] for call in lp_fee_mock.call_args_list)
+        self.assertEqual(quoted, ["0", "1"])
+        self.assertEqual(updates["0x03"], (1700000000, 1003, "0", "0x03"))
+
+    def test_records_only_searched_missing_deposits(self):
+        """Test that fills whose search failed are not counted as missing."""
+        fills = [
+            self.make_fill("0x01", 1, 1000),
+            self.make_fill("0x02", 2, 1000),
+        ]
+
+        result, lp_fee_mock, updates, missing = self.run_batch(fills, {}, {(1, 1)})
+
+        self.assertEqual(result, (0, 2))
+        lp_fee_mock.assert_not_called()
+        self.assertEqual(updates, {})
+        self.assertEqual(missing, ["0x01"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,10 @@
 Test for init_db.py
 
 Tests database initialization behavior:
-1. When database exists with tables - should not modify
-2. When database doesn't exist - should create with correct schema
-3. When database exists but is empty - should create tables
+1. When database exists with tables of an older schema - should migrate
+2. When database is at the current schema version - should not modify
+3. When database doesn't exist - should create with correct schema
+4. When database exists but is empty - should create tables
 """
 
 import os
@@ -67,7 +68,7 @@ class TestInitDb(unittest.TestCase):
         self.temp_dir.cleanup()
 
     def test_db_file_already_exists_with_tables(self):
-        """Test that init_db doesn't modify an existing database with tables."""
+        """Test that init_db migrates an existing database of an older schema."""
         # Create a database file with the expected schema
         conn = sqlite3.connect(self.test_db_path)
         cursor = conn.cursor()
@@ -235,25 +236,52 @@ class TestInitDb(unittest.TestCase):
         conn.commit()
         conn.close()
 
-        # Get file modification time
-        original_mtime = os.path.getmtime(self.test_db_path)
-
         # Run init_db
-        from src.init_db import init_db
+        from src.init_db import SCHEMA_VERSION, init_db
 
         init_db()
 
-        # Check that file modification time hasn't changed
-        self.assertEqual(original_mtime, os.path.getmtime(self.test_db_path))
-
-        # Verify the test data is still intact
         conn = sqlite3.connect(self.test_db_path)
         cursor = conn.cursor()
+
+        # Verify the test data is still intact
         cursor.execute("SELECT name FROM Chain WHERE chain_id=1")
         result = cursor.fetchone()
+        self.assertEqual(result[0], "Test Chain")
+
+        # Verify the missing columns and the indexes were added
+        cursor.execute("PRAGMA table_info(Fill)")
+        columns = {row[1] for row in cursor.fetchall()}
+        self.assertIn("deposit_block_number", columns)
+        self.assertIn("enrichment_attempts", columns)
+        self.assertIn("last_enrichment_attempt", columns)
+        cursor.execute("PRAGMA table_info(Bundle)")
+        columns = {row[1] for row in cursor.fetchall()}
+        self.assertIn("propose_timestamp", columns)
+        self.assertIn("settlement_timestamp", columns)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        indexes = {row[0] for row in cursor.fetchall()}
+        self.assertIn("idx_fill_repayment_block", indexes)
+        self.assertIn("idx_bundle_chain_bundle", indexes)
+
+        # Verify the schema version was stamped
+        cursor.execute("PRAGMA user_version")
+        self.assertEqual(cursor.fetchone()[0], SCHEMA_VERSION)
         conn.close()
 
-        self.assertEqual(result[0], "Test Chain")
+    def test_db_file_at_current_schema_version(self):
+        """Test that init_db doesn't modify a database at the current version."""
+        from src.init_db import init_db
+
+        init_db()
+
+        # Get file modification time
+        original_mtime = os.path.getmtime(self.test_db_path)
+
+        init_db()
+
+        # Check that file modification time hasn't changed
+        self.assertEqual(original_mtime, os.path.getmtime(self.test_db_path))
 
     def test_creates_correct_tables(self):
         """Test that init_db creates the correct tables when database doesn't exist."""
@@ -355,6 +383,12 @@ class TestInitDb(unittest.TestCase):
         self.assertEqual(chains[0], (1, "Ethereum"))
         self.assertEqual(chains[1], (42161, "Arbitrum"))
 
+        # Verify the new database uses 8 KiB pages and the WAL journal
+        cursor.execute("PRAGMA page_size")
+        self.assertEqual(cursor.fetchone()[0], 8192)
+        cursor.execute("PRAGMA journal_mode")
+        self.assertEqual(cursor.fetchone()[0], "wal")
+
         conn.close()
 
     def test_creates_tables_in_empty_db(self):
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test for process_repayments.py
+
+Tests the bundle lookups behind the BundleReturn records:
+1. A bundle's fills are grouped per token in block order
+2. A bundle's returns are grouped per token, with the first return's tx_hash
+3. A bundle's block range starts right after the previous bundle of its chain,
+   also when bundles share an end_block
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+
+# Add the parent directory to sys.path to import process_repayments
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.init_db import DDL_STMTS  # noqa: E402
+from src.process_repayments import (  # noqa: E402
+    get_bundle_block_ranges,
+    get_bundle_fills,
+    get_bundle_returns,
+)
+
+
+class RepaymentsDbTestCase(unittest.TestCase):
+    """Base test case running the repayment queries on an in-memory database."""
+
+    def setUp(self):
+        """Create the schema in an in-memory database."""
+        self.conn = sqlite3.connect(":memory:")
+        for stmt in DDL_STMTS:
+            self.conn.execute(stmt)
+
+    def tearDown(self):
+        """Close the in-memory database."""
+        self.conn.close()
+
+
+class TestBundleFillsAndReturns(RepaymentsDbTestCase):
+    """Test case for get_bundle_fills and get_bundle_returns."""
+
+    def insert_fill(self, tx_hash, token, block_number, amount, lp_fee, **columns):
+        """Insert a fill repaid on chain 10."""
+        row = {
+            "tx_hash": tx_hash,
+            "route_id": 1,
+            "depositor": "0xdepositor",
+            "recipient": "0xrecipient",
+            "exclusive_relayer": "0x0",
+            "input_token": "0xinput",
+            "output_token": token,
+            "input_amount": amount,
+            "output_amount": amount,
+            "origin_chain_id": 1,
+            "destination_chain_id": 10,
+            "deposit_id": tx_hash,
+            "repayment_chain_id": 10,
+            "block_number": block_number,
+            "tx_timestamp": 1700000000,
+            "lp_fee": lp_fee,
+        }
+        row.update(columns)
+        self.conn.execute(
+            f"INSERT INTO Fill ({', '.join(row)}) "
+            f"VALUES ({', '.join('?' for _ in row)})",
+            list(row.values()),
+        )
+
+    def insert_return(self, tx_hash, token, block_number, amount, bundle_id=7):
+        """Insert a return of the relayer on chain 10."""
+        self.conn.execute(
+            """
+            INSERT INTO Return (
+                tx_hash, return_chain_id, return_token, return_amount,
+                root_bundle_id, leaf_id, refund_address, is_deferred, caller,
+                block_number, tx_timestamp
+            ) VALUES (?, 10, ?, ?, ?, 0, '0xrelayer', 0, '0xcaller', ?, 0)
+            """,
+            (tx_hash, token, amount, bundle_id, block_number),
+        )
+
+    def test_fills_grouped_per_token_in_block_order(self):
+        """Test that each token's lists are aligned and in block order."""
+        big_amount = str(2**70)
+        # Inserted out of block order
+        self.insert_fill("0x03", "0xusdc", 130, "30", None)
+        self.insert_fill("0x01", "0xusdc", 110, big_amount, "1")
+        self.insert_fill("0x02", "0xweth", 120, "20", "2")
+        self.insert_fill("0x04", "0xusdc", 120, "40", "4")
+        # Outside the bundle, failed, or repaid on another chain
+        self.insert_fill("0x05", "0xusdc", 99, "50", "5")
+        self.insert_fill("0x06", "0xusdc", 115, "60", "6", is_success=0)
+        self.insert_fill("0x07", "0xusdc", 115, "70", "7", repayment_chain_id=1)
+
+        fills = get_bundle_fills(self.conn.cursor(), 10, 100, 200)
+
+        self.assertEqual(
+            fills,
+            {
+                "0xusdc": {
+                    "input_amounts": [big_amount, "40", "30"],
+                    "lp_fees": ["1", "4", "0"],
+                    "tx_hashes": ["0x01", "0x04", "0x03"],
+                },
+                "0xweth": {
+                    "input_amounts": ["20"],
+                    "lp_fees": ["2"],
+                    "tx_hashes": ["0x02"],
+                },
+            },
+        )
+
+    def test_returns_keep_first_tx_hash(self):
+        """Test that the tx_hash of the earliest return is kept per token."""
+        self.insert_return("0xb2", "0xusdc", 220, "200")
+        self.insert_return("0xa1", "0xusdc", 210, "100")
+        self.insert_return("0xc3", "0xweth", 230, "300")
+        self.insert_return("0xd4", "0xusdc", 240, "400", bundle_id=8)
+
+        returns = get_bundle_returns(self.conn.cursor(), 7, 10)
+
+        self.assertEqual(
+            returns,
+            {
+                "0xusdc": {"return_amounts": ["100", "200"], "tx_hash": "0xa1"},
+                "0xweth": {"return_amounts": ["300"], "tx_hash": "0xc3"},
+            },
+        )
+
+
+class TestGetBundleBlockRanges(RepaymentsDbTestCase):
+    """Test case for get_bundle_block_ranges."""
+
+    def insert_bundles(self, bundles):
+        """Insert (bundle_id, chain_id, end_block) bundles."""
+        self.conn.executemany(
+            """
+            INSERT INTO Bundle (bundle_id, chain_id, relayer_refund_root, end_block)
+            VALUES (?, ?, '0xroot', ?)
+            """,
+            bundles,
+        )
+
+    def test_ranges_follow_previous_bundle(self):
+        """Test that each chain's bundles cover consecutive block ranges."""
+        self.insert_bundles(
+            [
+                (1, 1, 100),
+                (2, 1, 250),
+                (3, 1, 400),
+                (1, 10, 5000),
+                (2, 10, 7000),
+            ]
+        )
+
+        ranges = get_bundle_block_ranges(self.conn.cursor())
+
+        self.assertEqual(
+            ranges,
+            {
+                (1, 1): (1, 100),
+                (2, 1): (101, 250),
+                (3, 1): (251, 400),
+                (1, 10): (1, 5000),
+                (2, 10): (5001, 7000),
+            },
+        )
+
+    def test_bundles_sharing_end_block(self):
+        """Test that bundles with the same end_block get the same range."""
+        # A chain without new blocks between two proposals repeats its
+        # end_block, so both bundles start after the bundle before them
+        self.insert_bundles(
+            [
+                (1, 1, 100),
+                (2, 1, 250),
+                (3, 1, 250),
+                (4, 1, 300),
+            ]
+        )
+
+        ranges = get_bundle_block_ranges(self.conn.cursor())
+
+        self.assertEqual(
+            ranges,
+            {
+                (1, 1): (1, 100),
+                (2, 1): (101, 250),
+                (3, 1): (101, 250),
+                (4, 1): (251, 300),
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
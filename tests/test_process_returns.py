@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test for process_returns.py
+
+Tests fetching ExecutedRelayerRefundRoot events:
+1. The topic filter matches the event signature in spoke_abi.json
+2. Only logs whose data holds the relayer address are decoded
+3. Nothing is fetched when the relayer address is not set
+4. Returns that are already stored are skipped on insert
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+from web3 import Web3
+
+# Add the parent directory to sys.path to import process_returns
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.init_db import DDL_STMTS  # noqa: E402
+from src.process_returns import (  # noqa: E402
+    get_executed_relayer_refund_root_events,
+    process_chain_returns,
+)
+
+RELAYER_ADDRESS = "0x" + "12" * 20
+OTHER_ADDRESS = "0x" + "34" * 20
+
+
+def address_word(address):
+    """ABI-encode an address as a 32-byte word."""
+    return bytes.fromhex(address[2:]).rjust(32, b"\0")
+
+
+class TestGetExecutedRelayerRefundRootEvents(unittest.TestCase):
+    """Test case for get_executed_relayer_refund_root_events."""
+
+    def setUp(self):
+        """Set up a mock spoke pool contract."""
+        self.event = mock.Mock()
+        self.event.process_log.side_effect = lambda log: {
+            "blockNumber": log["blockNumber"]
+        }
+
+        self.contract = mock.Mock(address="0x" + "ab" * 20)
+        self.contract.events.ExecutedRelayerRefundRoot.return_value = self.event
+        self.contract.w3.eth.block_number = 200
+
+        self.relayer_patcher = mock.patch(
+            "src.process_returns.RELAYER_ADDRESS", RELAYER_ADDRESS
+        )
+        self.relayer_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.relayer_patcher.stop()
+
+    def test_topic_matches_event_signature(self):
+        """Test that logs are filtered on the ExecutedRelayerRefundRoot topic."""
+        self.contract.w3.eth.get_logs.return_value = []
+
+        get_executed_relayer_refund_root_events(self.contract, 100, 1)
+
+        params = self.contract.w3.eth.get_logs.call_args[0][0]
+        expected_topic = Web3.keccak(
+            text=(
+                "ExecutedRelayerRefundRoot(uint256,uint256,uint256[],uint32,"
+                "uint32,address,address[],bool,address)"
+            )
+        ).to_0x_hex()
+        self.assertEqual(params["topics"], [expected_topic])
+        self.assertEqual((params["fromBlock"], params["toBlock"]), (100, 200))
+
+    def test_decodes_only_logs_with_relayer_address(self):
+        """Test that logs without the relayer address are skipped undecoded."""
+        amount_word = (10**18).to_bytes(32, "big")
+        self.contract.w3.eth.get_logs.return_value = [
+            {
+                "blockNumber": 110,
+                "data": amount_word + address_word(RELAYER_ADDRESS),
+            },
+            {
+                "blockNumber": 120,
+                "data": amount_word + address_word(OTHER_ADDRESS),
+            },
+            {
+                "blockNumber": 130,
+                "data": address_word(OTHER_ADDRESS) + address_word(RELAYER_ADDRESS),
+            },
+        ]
+
+        events = get_executed_relayer_refund_root_events(self.contract, 100, 1)
+
+        self.assertEqual(events, [{"blockNumber": 110}, {"blockNumber": 130}])
+        self.assertEqual(self.event.process_log.call_count, 2)
+
+    def test_skips_chain_without_relayer_address(self):
+        """Test that no logs are fetched when RELAYER_ADDRESS is not set."""
+        with mock.patch("src.process_returns.RELAYER_ADDRESS", None):
+            events = get_executed_relayer_refund_root_events(self.contract, 100, 1)
+
+        self.assertEqual(events, [])
+        self.contract.w3.eth.get_logs.assert_not_called()
+
+
+class TestProcessChainReturns(unittest.TestCase):
+    """Test case for process_chain_returns."""
+
+    def setUp(self):
+        """Create the schema and patch event and timestamp fetching."""
+        self.conn = sqlite3.connect(":memory:")
+        for stmt in DDL_STMTS:
+            self.conn.execute(stmt)
+
+        event = {
+            "transactionHash": bytes.fromhex("aa" * 32),
+            "blockNumber": 110,
+            "args": {
+                "l2TokenAddress": "0x" + "cd" * 20,
+                "refundAmounts": [10**18],
+                "rootBundleId": 7,
+                "leafId": 0,
+                "refundAddresses": [RELAYER_ADDRESS],
+                "deferredRefunds": False,
+                "caller": OTHER_ADDRESS,
+            },
+        }
+        self.patchers = [
+            mock.patch("src.process_returns.RELAYER_ADDRESS", RELAYER_ADDRESS),
+            mock.patch(
+                "src.process_returns.get_executed_relayer_refund_root_events",
+                return_value=[event],
+            ),
+            mock.patch(
+                "src.process_returns.get_block_timestamps",
+                return_value={110: 1700000000},
+            ),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """Stop the patchers and close the in-memory database."""
+        for patcher in self.patchers:
+            patcher.stop()
+        self.conn.close()
+
+    def test_skips_returns_already_stored(self):
+        """Test that re-processing an event stores it only once."""
+        self.assertEqual(process_chain_returns(1, mock.Mock(), 100, self.conn), 1)
+        self.assertEqual(process_chain_returns(1, mock.Mock(), 100, self.conn), 0)
+
+        count = self.conn.execute("SELECT COUNT(*) FROM Return").fetchone()[0]
+        self.assertEqual(count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test for web3_utils.py
+
+Tests reading block timestamps from batched get_block requests:
+1. Formatted blocks and raw hex JSON-RPC results both yield int timestamps
+2. A failed block request raises instead of surfacing a KeyError
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add the parent directory to sys.path to import web3_utils
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.web3_utils import get_block_timestamps  # noqa: E402
+
+
+class TestGetBlockTimestamps(unittest.TestCase):
+    """Test case for get_block_timestamps."""
+
+    def setUp(self):
+        """Set up a mock web3 client whose batch returns self.results."""
+        self.results = []
+        self.w3 = mock.MagicMock()
+        batch = self.w3.batch_requests.return_value.__enter__.return_value
+        batch.execute.side_effect = lambda: self.results
+
+        self.web3_patcher = mock.patch("src.web3_utils.get_web3", return_value=self.w3)
+        self.web3_patcher.start()
+        self.chains_patcher = mock.patch(
+            "src.web3_utils.get_chains", return_value={"rpc_url": "http://rpc"}
+        )
+        self.chains_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.web3_patcher.stop()
+        self.chains_patcher.stop()
+
+    def test_formatted_and_raw_responses(self):
+        """Test that both response shapes are read as int timestamps."""
+        self.results = [
+            {"number": 100, "timestamp": 1700000000},
+            {"jsonrpc": "2.0", "id": 1, "result": {"timestamp": "0x6553f180"}},
+        ]
+
+        timestamps = get_block_timestamps(1, [101, 100, 100])
+
+        self.assertEqual(timestamps, {100: 1700000000, 101: 0x6553F180})
+
+    def test_error_response_raises(self):
+        """Test that an errored block request raises ValueError."""
+        self.results = [
+            {"jsonrpc": "2.0", "id": 0, "error": {"code": -32000, "message": "x"}},
+        ]
+
+        with self.assertRaisesRegex(ValueError, "Error getting block 100"):
+            get_block_timestamps(1, [100])
+
+
+if __name__ == "__main__":
+    unittest.main()